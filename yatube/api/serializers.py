@@ -0,0 +1,65 @@
+"""Представление объектов в ответах API: словари для JSON."""
+from posts import counters
+
+
+def _datetime(value):
+    return value.isoformat()
+
+
+def post_data(post):
+    card = post.thumbs.get('card')
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'created': _datetime(post.created),
+        'author': post.author.username,
+        'group': post.group.slug if post.group else None,
+        'image': post.image.url if post.image else None,
+        'thumbnail': card.url if card else None,
+    }
+
+
+def group_data(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }
+
+
+def profile_data(user):
+    # строки статистики может не быть у пользователя, заведённого в обход
+    # сигнала
+    stats = counters.user_stats(user)
+    return {
+        'username': user.username,
+        'full_name': user.get_full_name(),
+        'posts_count': stats.posts_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.pk,
+        'text': comment.text,
+        'created': _datetime(comment.created),
+        'author': comment.author.username,
+    }
+
+
+def page_data(request, page, serialize):
+    """Страница выдачи со ссылками на соседние страницы по курсорам."""
+    return {
+        'page': page.number,
+        'results': [serialize(obj) for obj in page],
+        'next': (
+            f'{request.path}?after={page.next_cursor}'
+            if page.next_cursor else None
+        ),
+        'previous': (
+            f'{request.path}?before={page.previous_cursor}'
+            if page.previous_cursor else None
+        ),
+    }
@@ -0,0 +1,132 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User, UserStats
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='TestUser', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test-slug',
+            description='test description'
+        )
+        for i in range(12):
+            cls.post = Post.objects.create(
+                text=f'test text {i}', author=cls.user, group=cls.group
+            )
+        Comment.objects.create(
+            text='test comment', author=cls.user, post=cls.post
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_posts_pages_follow_cursors(self):
+        response = self.client.get(reverse('api:posts'))
+        self.assertEqual(response['Content-Type'], 'application/json')
+        data = response.json()
+        self.assertEqual(data['page'], 1)
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0], {
+            'id': self.post.pk,
+            'text': 'test text 11',
+            'created': self.post.created.isoformat(),
+            'author': 'TestUser',
+            'group': 'test-slug',
+            'image': None,
+            'thumbnail': None,
+        })
+        self.assertIsNone(data['previous'])
+        data_2 = self.client.get(data['next']).json()
+        self.assertEqual(data_2['page'], 2)
+        self.assertEqual(
+            [post['text'] for post in data_2['results']],
+            ['test text 1', 'test text 0'],
+        )
+        self.assertIsNone(data_2['next'])
+        self.assertEqual(
+            self.client.get(data_2['previous']).json()['results'],
+            data['results'],
+        )
+
+    def test_group_profile_post_and_comments(self):
+        group = self.client.get(
+            reverse('api:group', kwargs={'slug': 'test-slug'})
+        ).json()
+        self.assertEqual(group['group']['posts_count'], 12)
+        self.assertEqual(len(group['posts']['results']), 10)
+        profile = self.client.get(
+            reverse('api:profile', kwargs={'username': 'TestUser'})
+        ).json()
+        self.assertEqual(profile['profile']['full_name'], 'Лев Толстой')
+        self.assertEqual(profile['profile']['posts_count'], 12)
+        post = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(post['comments_count'], 1)
+        comments = self.client.get(
+            reverse('api:comments', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(
+            [comment['text'] for comment in comments['results']],
+            ['test comment'],
+        )
+        groups = self.client.get(reverse('api:groups')).json()
+        self.assertEqual(groups['results'][0]['slug'], 'test-slug')
+
+    def test_profile_without_stats(self):
+        UserStats.objects.filter(user=ApiTests.user).delete()
+        response = self.client.get(
+            reverse('api:profile', kwargs={'username': 'TestUser'})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['profile']['posts_count'], 12)
+
+    def test_not_found_is_json(self):
+        response = self.client.get(
+            reverse('api:group', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_unchanged_feed_answers_not_modified(self):
+        url = reverse('api:group', kwargs={'slug': 'test-slug'})
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        # группа и дата её последнего поста читаются одним запросом
+        with self.assertNumQueries(1):
+            response_304 = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response_304.status_code, 304)
+        self.assertEqual(response_304.content, b'')
+        response_304 = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response_304.status_code, 304)
+
+    def test_writes_change_etag(self):
+        url = reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            text='fresh comment', author=self.user, post=self.post
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['comments_count'], 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pages_have_own_etags(self):
+        response = self.client.get(reverse('api:posts'))
+        response_2 = self.client.get(response.json()['next'])
+        self.assertNotEqual(response['ETag'], response_2['ETag'])
@@ -0,0 +1,103 @@
+from functools import wraps
+
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from core.concurrency import gather
+from core.conditional import feed_condition
+from core.paginator import CursorPaginator
+from posts import conditions
+from posts.conditions import newest
+from posts.models import Group, Post, User
+from posts.views import comments_page, paginator
+
+from . import serializers
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def api_view(state):
+    """Только GET и HEAD, условные ответы по state, ошибки 404 в JSON."""
+    def decorator(view):
+        @require_safe
+        @feed_condition(state)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except Http404:
+                return json_response({'detail': 'Не найдено'}, status=404)
+        return wrapper
+    return decorator
+
+
+@api_view(conditions.index_state)
+def posts(request):
+    page = paginator(request, Post.objects.for_feed(), 'index')
+    return json_response(
+        serializers.page_data(request, page, serializers.post_data)
+    )
+
+
+@api_view(conditions.post_state)
+def post_detail(request, post_id):
+    post = get_object_or_404(Post.objects.for_feed(), pk=post_id)
+    return json_response(dict(
+        serializers.post_data(post), comments_count=post.comments_count
+    ))
+
+
+@api_view(conditions.comments_state)
+def post_comments(request, post_id):
+    # пост нужен только для ответа 404
+    _, page = gather(
+        lambda: get_object_or_404(Post, pk=post_id),
+        lambda: comments_page(request, post_id),
+    )
+    return json_response(serializers.page_data(
+        request, page, serializers.comment_data
+    ))
+
+
+def groups_state(request):
+    return ['groups'], newest(Group.objects.all())
+
+
+@api_view(groups_state)
+def groups(request):
+    groups = Group.objects.order_by('-created', '-pk')
+    page = CursorPaginator(groups, 10).get_cursor_page(request.GET)
+    return json_response(
+        serializers.page_data(request, page, serializers.group_data)
+    )
+
+
+@api_view(conditions.group_state)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    page = paginator(request, group.posts.for_feed(), f'group:{group.pk}')
+    return json_response({
+        'group': dict(
+            serializers.group_data(group), posts_count=group.posts_count
+        ),
+        'posts': serializers.page_data(request, page, serializers.post_data),
+    })
+
+
+@api_view(conditions.profile_state)
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    page = paginator(
+        request, author.posts.for_feed(), f'author:{author.pk}'
+    )
+    return json_response({
+        'profile': serializers.profile_data(author),
+        'posts': serializers.page_data(request, page, serializers.post_data),
+    })
@@ -0,0 +1,62 @@
+"""Генератор данных для нагрузочных тестов на mixer и Faker.
+
+Записи создаются через save(), как на сайте: срабатывают сигналы
+счётчиков, лент подписок и поискового индекса.
+"""
+import random
+
+from mixer.backend.django import Mixer
+
+from posts.models import Comment, Follow, Group, Post, User
+
+SIZES = {
+    'users': 50,
+    'groups': 5,
+    'posts': 500,
+    'comments': 1000,
+    'follows': 200,
+}
+
+
+def generate(sizes=None, seed=1):
+    """Создаёт данные и возвращает их объём по моделям."""
+    sizes = dict(SIZES, **(sizes or {}))
+    rng = random.Random(seed)
+    mixer = Mixer(locale='ru')
+    mixer.faker.seed_instance(seed)
+    users = mixer.cycle(sizes['users']).blend(
+        User,
+        username=mixer.sequence('user{0}'),
+        first_name=lambda: mixer.faker.first_name(),
+        last_name=lambda: mixer.faker.last_name(),
+    )
+    groups = mixer.cycle(sizes['groups']).blend(
+        Group,
+        title=lambda: mixer.faker.sentence(nb_words=3),
+        slug=mixer.sequence('group{0}'),
+    )
+    posts = mixer.cycle(sizes['posts']).blend(
+        Post,
+        author=lambda: rng.choice(users),
+        group=lambda: rng.choice(groups + [None]),
+        text=lambda: mixer.faker.text(max_nb_chars=400),
+        image='',
+    )
+    mixer.cycle(sizes['comments']).blend(
+        Comment,
+        author=lambda: rng.choice(users),
+        post=lambda: rng.choice(posts),
+        text=lambda: mixer.faker.sentence(),
+    )
+    pairs = set()
+    while len(pairs) < min(
+        sizes['follows'], len(users) * (len(users) - 1)
+    ):
+        user, author = rng.sample(users, 2)
+        pairs.add((user.pk, author.pk))
+    for user_id, author_id in sorted(pairs):
+        Follow.objects.create(user_id=user_id, author_id=author_id)
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (User, Group, Post, Comment, Follow)
+    }
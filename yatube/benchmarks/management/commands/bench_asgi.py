@@ -0,0 +1,162 @@
+import asyncio
+import time
+from io import BytesIO
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.urls import reverse
+
+from benchmarks import data, runner
+from core.asgi import AsgiHandler
+from core.management.commands.bench_cache import percentile
+from core.management.utils import temporary_database
+
+from .benchmark import NO_CACHE
+
+# WSGI — один синхронный воркер; ASGI — цикл событий и пул потоков,
+# asgi+views — ещё и одновременные запросы к БД внутри view
+MODES = ('wsgi', 'asgi', 'asgi+views')
+SIZES = {'users': 20, 'groups': 3, 'posts': 200, 'comments': 300,
+         'follows': 50}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI и ASGI на страницах '
+        'чтения при искусственной задержке каждого запроса к БД'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--latency', type=float, default=5,
+            help='Задержка каждого запроса к БД, мс',
+        )
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--concurrency', type=int, default=16,
+            help='Запросов одновременно и потоков ASGI',
+        )
+        parser.add_argument(
+            '--view-threads', type=int, default=4,
+            help='VIEW_THREADS в режиме asgi+views',
+        )
+        parser.add_argument('--modes', default=','.join(MODES))
+
+    def handle(self, *args, **options):
+        latency = options['latency'] / 1000
+
+        def slow_database(execute, sql, params, many, context):
+            # сетевая задержка запросов приложения; PRAGMA при
+            # подключении к SQLite не в счёт
+            if not sql.startswith('PRAGMA'):
+                time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            if slow_database not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_database)
+
+        with temporary_database(prefix='yatube-asgi-'), override_settings(
+            DEBUG=False, CACHES=NO_CACHE, RATE_LIMIT_ENABLED=False
+        ):
+            data.generate(SIZES)
+            paths = self.paths()
+            connection_created.connect(add_latency)
+            for connection in connections.all():
+                add_latency(None, connection)
+            self.stdout.write(
+                f'{"режим":<12} {"запр./с":>8} {"p50, мс":>9} {"p95, мс":>9}'
+            )
+            try:
+                for mode in options['modes'].split(','):
+                    latencies, elapsed = self.run_mode(mode, paths, options)
+                    self.stdout.write(
+                        f'{mode:<12} {len(latencies) / elapsed:>8.1f} '
+                        f'{percentile(latencies, 0.5):>9.1f} '
+                        f'{percentile(latencies, 0.95):>9.1f}'
+                    )
+            finally:
+                connection_created.disconnect(add_latency)
+                for connection in connections.all():
+                    if slow_database in connection.execute_wrappers:
+                        connection.execute_wrappers.remove(slow_database)
+
+    def paths(self):
+        """Страницы чтения: главная, группа, профиль, запись и API."""
+        objects = runner.sample_objects()
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[objects['group'].slug]),
+            reverse('posts:profile', args=[objects['author'].username]),
+            reverse('posts:post_detail', args=[objects['post'].pk]),
+            reverse('api:posts'),
+        ]
+
+    def scope(self, path):
+        return {
+            'type': 'http',
+            'method': 'GET',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 5000),
+            'server': ('testserver', 80),
+        }
+
+    def run_mode(self, mode, paths, options):
+        view_threads = options['view_threads'] if mode == 'asgi+views' else 0
+        with override_settings(VIEW_THREADS=view_threads):
+            started = time.perf_counter()
+            if mode == 'wsgi':
+                latencies = self.run_wsgi(paths, options)
+            else:
+                latencies = asyncio.run(self.run_asgi(paths, options))
+            return latencies, time.perf_counter() - started
+
+    def run_wsgi(self, paths, options):
+        handler = WSGIHandler()
+        # окружение WSGI то же, что строит адаптер ASGI
+        environ = AsgiHandler(handler, threads=1)
+        latencies = []
+        for number in range(options['requests']):
+            started = time.perf_counter()
+            response = handler(
+                environ.environ(
+                    self.scope(paths[number % len(paths)]), BytesIO()
+                ),
+                lambda status, headers, exc_info=None: None,
+            )
+            b''.join(response)
+            response.close()
+            latencies.append((time.perf_counter() - started) * 1000)
+        environ.executor.shutdown()
+        return latencies
+
+    async def run_asgi(self, paths, options):
+        application = AsgiHandler(WSGIHandler(), options['concurrency'])
+        limit = asyncio.Semaphore(options['concurrency'])
+        latencies = []
+
+        async def request(path):
+            async with limit:
+                messages = [{'type': 'http.request', 'body': b''}]
+
+                async def receive():
+                    return messages.pop(0)
+
+                async def send(message):
+                    pass
+
+                started = time.perf_counter()
+                await application(self.scope(path), receive, send)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        await asyncio.gather(*[
+            request(paths[number % len(paths)])
+            for number in range(options['requests'])
+        ])
+        application.executor.shutdown()
+        return latencies
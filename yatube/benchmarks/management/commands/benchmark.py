@@ -0,0 +1,105 @@
+import json
+import platform
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from benchmarks import data, runner
+from core.management.utils import temporary_database
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест адресов posts.urls на сгенерированных данных '
+        'во временной БД: запросов в секунду, p50/p95/p99 и число '
+        'запросов к БД по каждому адресу'
+    )
+
+    def add_arguments(self, parser):
+        for name, size in data.SIZES.items():
+            parser.add_argument(f'--{name}', type=int, default=size)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Замеряемых запросов на каждый адрес',
+        )
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--routes', help='Только эти адреса, через запятую'
+        )
+        parser.add_argument(
+            '--no-cache', action='store_true',
+            help='Без кэша фрагментов: каждая страница рисуется заново',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+        parser.add_argument(
+            '--baseline', help='JSON прошлого прогона для сравнения'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.25,
+            help='Допустимый рост p95 относительно --baseline',
+        )
+        parser.add_argument(
+            '--noise-ms', type=float, default=2.0,
+            help='Рост p95 меньше этого числа миллисекунд не регрессия',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)['routes']
+        sizes = {name: options[name] for name in data.SIZES}
+        caches = NO_CACHE if options['no_cache'] else settings.CACHES
+        names = options['routes'] and options['routes'].split(',')
+        # без DEBUG, как в рабочем окружении: запросы к БД не копятся
+        # в connection.queries, их считает только CaptureQueriesContext
+        with temporary_database(prefix='yatube-bench-'):
+            with override_settings(DEBUG=False, CACHES=caches):
+                counts = data.generate(sizes, options['seed'])
+                results = runner.run(
+                    options['requests'], options['warmup'], names
+                )
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'meta': {
+                        'date': datetime.now().isoformat(),
+                        'python': platform.python_version(),
+                        'django': django.get_version(),
+                        'database': settings.DATABASES['default']['ENGINE'],
+                        'cache': caches['default']['BACKEND'],
+                        'data': counts,
+                        'requests': options['requests'],
+                    },
+                    'routes': results,
+                }, file, ensure_ascii=False, indent=2)
+        if baseline is not None:
+            regressions = runner.compare(
+                results, baseline, options['threshold'], options['noise_ms']
+            )
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f'Регрессий: {len(regressions)}')
+            self.stdout.write('Регрессий относительно --baseline нет')
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"адрес":<18} {"запр./с":>8} {"p50":>7} {"p95":>7} '
+            f'{"p99":>7} {"к БД":>5} {"ошибки":>7}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<18} {result["rps"]:>8.0f} {result["p50"]:>7.1f} '
+                f'{result["p95"]:>7.1f} {result["p99"]:>7.1f} '
+                f'{result["queries"]:>5g} {result["errors"]:>7}'
+            )
@@ -0,0 +1,170 @@
+"""Прогон всех адресов posts.urls через тестовый клиент Django.
+
+Запрос проходит весь стек: middleware, view, шаблоны и кэш фрагментов.
+Для каждого адреса считаются задержки и число запросов к БД.
+"""
+import statistics
+import time
+from collections import Counter
+
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.management.commands.bench_cache import percentile
+from posts.models import Follow, Group, Post, User
+
+
+class Route:
+    def __init__(self, name, url, method='get', auth=False, data=None,
+                 status=200):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.auth = auth
+        self.data = data
+        self.status = status
+
+
+def routes(objects):
+    """Маршруты posts.urls с адресами на сгенерированных данных."""
+    post, own_post, author, reader, group = (
+        objects['post'], objects['own_post'], objects['author'],
+        objects['reader'], objects['group'],
+    )
+    return [
+        Route('index', lambda n: f'{reverse("posts:index")}?page={n % 5 + 1}'),
+        Route('group_list', lambda n: reverse(
+            'posts:group_list', kwargs={'slug': group.slug}
+        )),
+        Route('profile', lambda n: reverse(
+            'posts:profile', kwargs={'username': author.username}
+        )),
+        Route('post_detail', lambda n: reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}
+        )),
+        Route('comments', lambda n: reverse(
+            'posts:comments', kwargs={'post_id': post.pk}
+        )),
+        Route('post_create', lambda n: reverse('posts:post_create'),
+              auth=True),
+        Route('post_create:post', lambda n: reverse('posts:post_create'),
+              method='post', auth=True, status=302,
+              data=lambda n: {'text': f'Новый пост {n}'}),
+        Route('post_edit', lambda n: reverse(
+            'posts:post_edit', kwargs={'post_id': own_post.pk}
+        ), auth=True),
+        Route('add_comment', lambda n: reverse(
+            'posts:add_comment', kwargs={'post_id': post.pk}
+        ), method='post', auth=True, status=302,
+            data=lambda n: {'text': f'Комментарий {n}'}),
+        Route('profile_export', lambda n: reverse(
+            'posts:profile_export', kwargs={'username': reader.username}
+        ), auth=True),
+        Route('followed', lambda n: reverse('posts:followed'), auth=True),
+        # подписка и отписка чередуются, данные не копятся
+        Route('profile_follow', lambda n: reverse(
+            'posts:profile_follow', kwargs={'username': author.username}
+        ), auth=True, status=302),
+        Route('profile_unfollow', lambda n: reverse(
+            'posts:profile_unfollow', kwargs={'username': author.username}
+        ), auth=True, status=302),
+    ]
+
+
+def sample_objects():
+    """Типичные объекты: самый активный автор, его группа и запись."""
+    author = User.objects.order_by('-stats__posts_count').first()
+    reader = User.objects.exclude(pk=author.pk).order_by(
+        '-stats__following_count'
+    ).first()
+    Follow.objects.filter(user=reader, author=author).delete()
+    return {
+        'author': author,
+        'reader': reader,
+        'group': Group.objects.order_by('-posts_count').first(),
+        'post': Post.objects.order_by('-comments_count').first(),
+        'own_post': Post.objects.create(author=reader, text='Свой пост'),
+    }
+
+
+def run(requests=50, warmup=5, names=None):
+    """Замеряет маршруты и возвращает {маршрут: результаты}."""
+    objects = sample_objects()
+    guest = Client()
+    reader = Client()
+    reader.force_login(objects['reader'])
+    results = {}
+    selected = [
+        route for route in routes(objects)
+        if names is None or route.name in names
+    ]
+    samples = {route.name: [] for route in selected}
+    queries = {route.name: [] for route in selected}
+    statuses = {route.name: Counter() for route in selected}
+    # маршруты запрашиваются чаще любых лимитов частоты
+    with override_settings(RATE_LIMIT_ENABLED=False):
+        for number in range(warmup + requests):
+            # маршруты по очереди, как в смешанной нагрузке
+            for route in selected:
+                client = reader if route.auth else guest
+                data = route.data(number) if route.data else None
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = getattr(client, route.method)(
+                        route.url(number), data
+                    )
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    elapsed = (time.perf_counter() - started) * 1000
+                if number < warmup:
+                    continue
+                samples[route.name].append(elapsed)
+                queries[route.name].append(len(captured))
+                statuses[route.name][response.status_code] += 1
+    for route in selected:
+        latencies = samples[route.name]
+        results[route.name] = {
+            'requests': len(latencies),
+            'rps': 1000 * len(latencies) / sum(latencies),
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'queries': statistics.median(queries[route.name]),
+            'errors': sum(
+                count for status, count in statuses[route.name].items()
+                if status != route.status
+            ),
+        }
+    return results
+
+
+def compare(results, baseline, threshold, noise_ms=2.0):
+    """Регрессии относительно базового прогона: список описаний.
+
+    Регрессия — рост p95 больше чем на threshold (и больше шума
+    noise_ms), рост числа запросов к БД или новые ошибки.
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = base['p95'] * (1 + threshold)
+        if current['p95'] > limit and current['p95'] - base['p95'] > noise_ms:
+            regressions.append(
+                f'{name}: p95 {current["p95"]:.1f} мс, '
+                f'было {base["p95"]:.1f} мс'
+            )
+        if current['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: запросов к БД {current["queries"]:g}, '
+                f'было {base["queries"]:g}'
+            )
+        if current['errors'] > base['errors']:
+            regressions.append(
+                f'{name}: ошибок {current["errors"]}, '
+                f'было {base["errors"]}'
+            )
+    return regressions
@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from posts.models import Post
+
+from . import data, runner
+
+SMALL = {'users': 5, 'groups': 2, 'posts': 15, 'comments': 10, 'follows': 6}
+
+
+class BenchmarkTests(TestCase):
+    def test_generate(self):
+        counts = data.generate(SMALL)
+        self.assertEqual(counts, {
+            'user': 5, 'group': 2, 'post': 15, 'comment': 10, 'follow': 6,
+        })
+
+    def test_run_measures_routes(self):
+        data.generate(SMALL)
+        results = runner.run(requests=2, warmup=1)
+        self.assertEqual(
+            set(results),
+            {route.name for route in runner.routes(runner.sample_objects())},
+        )
+        for name, result in results.items():
+            with self.subTest(route=name):
+                self.assertEqual(result['requests'], 2)
+                self.assertEqual(result['errors'], 0)
+                self.assertGreater(result['queries'], 0)
+        # посты из post_create:post создаются по-настоящему
+        self.assertTrue(Post.objects.filter(text='Новый пост 2').exists())
+
+    def test_compare(self):
+        baseline = {
+            'index': {'p95': 10.0, 'queries': 3, 'errors': 0},
+            'profile': {'p95': 10.0, 'queries': 4, 'errors': 0},
+        }
+        results = {
+            'index': {'p95': 11.0, 'queries': 3, 'errors': 0},
+            'profile': {'p95': 20.0, 'queries': 5, 'errors': 0},
+            'followed': {'p95': 50.0, 'queries': 9, 'errors': 0},
+        }
+        self.assertEqual(runner.compare(results, baseline, 0.25), [
+            'profile: p95 20.0 мс, было 10.0 мс',
+            'profile: запросов к БД 5, было 4',
+        ])
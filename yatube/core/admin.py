@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'task',
+        'status',
+        'attempts',
+        'run_at',
+        'locked_by',
+    )
+    search_fields = ('task',)
+    list_filter = ('status', 'task')
+
+
+admin.site.register(Job, JobAdmin)
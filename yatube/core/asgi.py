@@ -0,0 +1,145 @@
+"""ASGI-приложение поверх обработчика WSGI Django.
+
+Django 2.2 не умеет ни ASGI, ни async view, а ORM у него синхронный.
+Поэтому запросы выполняются, как и в Django 3.x при синхронных view:
+обработчик WSGI вызывается в потоке из пула ASGI_THREADS, а цикл
+событий сервера (uvicorn, daphne, hypercorn) не ждёт ни БД, ни
+медленного клиента и держит сколько угодно соединений. Тело ответа,
+в том числе StreamingHttpResponse, читается в том же потоке, что и
+обрабатывал запрос: курсор БД потоковой выгрузки живёт в его
+соединении.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+
+class AsgiHandler:
+    def __init__(self, wsgi_application, threads=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемое соединение: {scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            # клиент отключился, не дослав запрос
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.executor, self.respond, loop, scope, body, send
+            )
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса; большое уходит во временный файл, как загрузки."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    def environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        # WSGI передаёт байты пути и заголовков строками latin-1
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'REMOTE_ADDR': client[0],
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                key = name
+            else:
+                key = f'HTTP_{name}'
+            if key in environ:
+                value = f'{environ[key]},{value}'
+            environ[key] = value
+        # тело уже получено целиком: его длина известна и для запросов
+        # с Transfer-Encoding: chunked
+        body.seek(0, 2)
+        environ['CONTENT_LENGTH'] = str(body.tell())
+        body.seek(0)
+        return environ
+
+    def respond(self, loop, scope, body, send):
+        """Выполняет запрос в потоке пула и отправляет ответ через цикл."""
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start.update(
+                type='http.response.start',
+                status=int(status.split(' ', 1)[0]),
+                headers=[
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            )
+
+        response = self.wsgi_application(
+            self.environ(scope, body), start_response
+        )
+        try:
+            send_sync(start)
+            for chunk in response:
+                if chunk:
+                    send_sync({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            send_sync({'type': 'http.response.body', 'body': b''})
+        finally:
+            # request_finished: закрывает соединения с БД этого потока
+            response.close()
+
+
+def get_asgi_application():
+    return AsgiHandler(get_wsgi_application())
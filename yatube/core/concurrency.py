@@ -0,0 +1,53 @@
+"""Независимые запросы к БД внутри одного view — одновременно.
+
+С сетевой БД большая часть времени view уходит на ожидание ответов.
+gather() отправляет независимые запросы из потоков пула VIEW_THREADS,
+и view ждёт самый долгий из них, а не их сумму. У каждого потока своё
+соединение с БД, поэтому функции должны сами получать результат
+(list(), exists(), get()), а не возвращать ленивые QuerySet.
+
+С локальной SQLite ожидания нет, а поток и соединение стоят дороже
+запроса, поэтому по умолчанию VIEW_THREADS = 0 и всё выполняется
+по очереди в потоке запроса.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import profiling
+
+_executors = {}
+
+
+def _executor(threads):
+    if threads not in _executors:
+        _executors[threads] = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='view'
+        )
+    return _executors[threads]
+
+
+def _call(function):
+    try:
+        return function()
+    finally:
+        # как в конце запроса: соединения потоков пула не висят вечно
+        close_old_connections()
+
+
+def gather(*functions):
+    """Вызывает функции одновременно и возвращает их результаты по порядку.
+
+    Первая выполняется в потоке запроса. Исключение любой из них
+    (например, Http404) поднимается здесь же.
+    """
+    threads = settings.VIEW_THREADS
+    if threads < 2 or len(functions) < 2:
+        return [function() for function in functions]
+    futures = [
+        _executor(threads).submit(_call, profiling.propagate(function))
+        for function in functions[1:]
+    ]
+    first = functions[0]()
+    return [first] + [future.result() for future in futures]
@@ -0,0 +1,80 @@
+"""Условные ответы (304 Not Modified) для лент.
+
+Состояние ленты — поколения её областей кэша и дата последней записи.
+Поколение меняется при любой записи в область и хранит время этой
+записи в микросекундах, поэтому по нему строятся и ETag, и
+Last-Modified. Дата последней записи из БД учитывает ещё и записи,
+добавленные в обход сигналов, например bulk_create.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .generations import get_generations
+
+
+def feed_condition(state, personal=False):
+    """Декоратор view с ETag и Last-Modified по состоянию ленты.
+
+    state(request, *args, **kwargs) возвращает (области, дата последней
+    записи или None) и, если этого мало, третьим элементом версию —
+    любое значение, которое входит в ETag. Вызывается один раз на
+    запрос. Для personal
+    страниц, которые выглядят по-разному для разных пользователей и
+    часовых поясов, они тоже входят в ETag.
+    """
+    def get_state(request, *args, **kwargs):
+        if not hasattr(request, 'feed_state'):
+            scopes, newest, *version = state(request, *args, **kwargs)
+            request.feed_state = (
+                get_generations(*scopes), newest, version
+            )
+        return request.feed_state
+
+    def etag(request, *args, **kwargs):
+        generations, newest, version = get_state(request, *args, **kwargs)
+        parts = [
+            request.get_full_path(),
+            *map(str, generations),
+            *map(str, version),
+        ]
+        if personal:
+            parts.extend([
+                str(request.user.pk),
+                timezone.get_current_timezone_name(),
+            ])
+        if newest is not None:
+            parts.append(newest.isoformat())
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        generations, newest, _ = get_state(request, *args, **kwargs)
+        times = [
+            datetime.fromtimestamp(generation / 10 ** 6, timezone.utc)
+            for generation in generations
+        ]
+        if newest is not None:
+            times.append(newest)
+        return max(times, default=None)
+
+    conditional = condition(etag_func=etag, last_modified_func=last_modified)
+
+    def decorator(view):
+        return _successful_only(conditional(view))
+    return decorator
+
+
+def _successful_only(view):
+    """Убирает ETag и Last-Modified из ответов с ошибкой: их нельзя
+    кэшировать и перепроверять как саму ленту."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            del response['ETag']
+            del response['Last-Modified']
+        return response
+    return wrapper
@@ -0,0 +1,73 @@
+"""Число записей ленты без полного COUNT(*) на больших таблицах.
+
+До COUNT_EXACT_LIMIT строк число точное: COUNT по подзапросу с LIMIT
+читает не больше этого числа строк. Дальше оно приблизительное: для
+всей таблицы — из статистики планировщика (pg_class.reltuples,
+sqlite_stat1 после ANALYZE), для выборки с условием — полный COUNT(*)
+не чаще раза в COUNT_CACHE_TIMEOUT секунд. Поддерживаемые счётчики
+(Group.posts_count, UserStats.posts_count) view передают пагинатору
+сами: они бесплатны.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+from .generations import get_generation
+
+
+def table_estimate(model, using='default'):
+    """Оценка числа строк таблицы по статистике БД или None."""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'sqlite':
+        # первое число stat любого индекса таблицы — число её строк
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 появляется только после ANALYZE
+        return None
+    if row is None:
+        return None
+    # reltuples до первого ANALYZE равен -1
+    estimate = int(float(str(row[0]).split()[0]))
+    return estimate if estimate >= 0 else None
+
+
+def count(queryset, scope=None):
+    """Возвращает (число строк queryset, точное ли оно).
+
+    С областью кэша scope точное число пересчитывается после записи в
+    область, а приблизительное живёт COUNT_CACHE_TIMEOUT секунд.
+    """
+    key = f'count:{scope}' if scope else None
+    generation = get_generation(scope) if scope else None
+    if key is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            total, exact, counted_generation = cached
+            if not exact or counted_generation == generation:
+                return total, exact
+    limit = settings.COUNT_EXACT_LIMIT
+    queryset = queryset.order_by()
+    total = queryset[:limit + 1].count()
+    exact = total <= limit
+    if not exact:
+        estimate = None
+        if not queryset.query.where:
+            estimate = table_estimate(queryset.model, queryset.db)
+        if estimate is None:
+            estimate = queryset.count()
+        total = max(total, estimate)
+    if key is not None:
+        cache.set(
+            key,
+            (total, exact, generation),
+            None if exact else settings.COUNT_CACHE_TIMEOUT,
+        )
+    return total, exact
@@ -0,0 +1,29 @@
+"""Настройка соединений с БД."""
+from django.conf import settings
+from django.db import connections
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Выполняет settings.SQLITE_PRAGMAS для нового соединения SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def check_connections(**kwargs):
+    """Закрывает оборвавшиеся постоянные соединения перед запросом.
+
+    Django 2.2 проверяет их только после ошибки, а при перезапуске
+    сервера БД первый запрос каждого процесса иначе завершится с 500.
+    """
+    if not settings.DATABASE_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict['CONN_MAX_AGE'] != 0
+            and not connection.is_usable()
+        ):
+            connection.close()
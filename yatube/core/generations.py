@@ -0,0 +1,43 @@
+"""Счётчики поколений для инвалидации кэша.
+
+Каждая область данных (лента, группа, автор, пост) имеет своё поколение.
+Поколение входит в ключи кэша, поэтому после записи достаточно сменить
+поколение области: старые записи перестают читаться и истекают сами.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def _key(scope):
+    return f'generation:{scope}'
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def get_generations(*scopes):
+    """Возвращает поколения перечисленных областей в том же порядке."""
+    keys = [_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            value = _now()
+            if not cache.add(key, value, None):
+                value = cache.get(key, value)
+            values[key] = value
+    return [values[key] for key in keys]
+
+
+def get_generation(*scopes):
+    """Возвращает общее поколение набора областей для ключа кэша."""
+    return '.'.join(str(value) for value in get_generations(*scopes))
+
+
+def bump(*scopes):
+    """Меняет поколение областей после записи в них."""
+    for scope in scopes:
+        key = _key(scope)
+        current = cache.get(key) or 0
+        cache.set(key, max(_now(), current + 1), None)
@@ -0,0 +1,162 @@
+"""Очередь фоновых задач в таблице БД.
+
+Функция, помеченная @task, вызывается как обычно, а task.delay(...)
+ставит вызов в очередь. Задание пишется в той же транзакции, что и
+вызвавший его код, поэтому воркер не увидит его раньше данных.
+Воркер запускается командой runworker. При JOBS_ALWAYS_EAGER задачи
+выполняются без очереди, сразу после фиксации транзакции.
+"""
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+from functools import partial
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Task:
+    def __init__(self, func, max_attempts, unique=False):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.unique = unique
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def run_eager(self, args, kwargs):
+        """Выполняет задачу сразу; ошибка пишется в лог, как у воркера,
+        и не доходит до вызвавшего кода."""
+        try:
+            with transaction.atomic():
+                self.func(*args, **kwargs)
+        except Exception:
+            logger.exception('Задача %s завершилась ошибкой', self.name)
+
+    def delay(self, *args, **kwargs):
+        """Ставит вызов в очередь; аргументы должны сериализоваться в JSON."""
+        if settings.JOBS_ALWAYS_EAGER:
+            run = partial(self.run_eager, args, kwargs)
+            if settings.JOBS_EAGER_ON_COMMIT:
+                # как у воркера: после фиксации транзакции, не держа её
+                # блокировок
+                transaction.on_commit(run)
+            else:
+                run()
+            return None
+        payload = json.dumps([args, kwargs])
+        if self.unique:
+            # такой же вызов ещё ждёт в очереди и увидит свежие данные;
+            # уже выполняемое задание не в счёт — оно могло их не застать
+            queued = Job.objects.filter(
+                task=self.name, payload=payload, status=Job.QUEUED,
+            ).first()
+            if queued is not None:
+                return queued
+        return Job.objects.create(
+            task=self.name,
+            payload=payload,
+            run_at=timezone.now(),
+            max_attempts=self.max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        )
+
+
+def task(func=None, *, max_attempts=None, unique=False):
+    """Регистрирует функцию как задачу очереди.
+
+    unique=True: повторный вызов с теми же аргументами не ставится,
+    пока прежний ждёт в очереди.
+    """
+    def decorator(func):
+        registered = Task(func, max_attempts, unique)
+        _registry[registered.name] = registered
+        return registered
+    return decorator(func) if func is not None else decorator
+
+
+def get_task(name):
+    if name not in _registry:
+        # задачи регистрируются при импорте своего модуля
+        import_module(name.rpartition('.')[0])
+    return _registry[name]
+
+
+def retry_delay(attempts):
+    """Экспоненциальная пауза перед следующей попыткой."""
+    delay = settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.JOBS_RETRY_DELAY_MAX))
+
+
+def claim(worker):
+    """Забирает одно готовое к запуску задание или возвращает None."""
+    now = timezone.now()
+    # задания упавшего воркера возвращаются в очередь
+    Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT),
+    ).update(status=Job.QUEUED)
+    candidates = Job.objects.filter(
+        status=Job.QUEUED,
+        run_at__lte=now,
+    ).values_list('pk', flat=True)[:10]
+    for pk in candidates:
+        # UPDATE с условием на статус: задание достаётся одному воркеру
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Выполняет задание; при ошибке планирует повтор или помечает сбой."""
+    try:
+        args, kwargs = json.loads(job.payload)
+        with transaction.atomic():
+            get_task(job.task).func(*args, **kwargs)
+    except Exception:
+        logger.exception('Задание %s завершилось ошибкой', job)
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+        else:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+        job.locked_by = ''
+        job.locked_at = None
+        job.save()
+        return False
+    job.delete()
+    return True
+
+
+def work(worker='worker', burst=False, poll_interval=1, max_jobs=None):
+    """Цикл воркера; при burst завершается, когда очередь пуста."""
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        job = claim(worker)
+        if job is None:
+            if burst:
+                break
+            time.sleep(poll_interval)
+            continue
+        run(job)
+        processed += 1
+    return processed
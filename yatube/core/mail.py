@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .jobs import task
+
+# поля письма, которые уходят в очередь; вложения не поддерживаются
+FIELDS = (
+    'subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+    'extra_headers',
+)
+
+
+def message_data(message):
+    """Письмо в виде, который сериализуется в JSON."""
+    data = {field: getattr(message, field) for field in FIELDS}
+    data['alternatives'] = [
+        list(alternative)
+        for alternative in getattr(message, 'alternatives', [])
+    ]
+    return data
+
+
+@task
+def deliver(data):
+    """Отправляет письмо через EMAIL_DELIVERY_BACKEND."""
+    alternatives = data.pop('alternatives', [])
+    headers = data.pop('extra_headers', {})
+    message = EmailMultiAlternatives(headers=headers, **data)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    get_connection(settings.EMAIL_DELIVERY_BACKEND).send_messages([message])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Ставит письма в очередь задач вместо отправки во время запроса."""
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if message.attachments:
+                raise ValueError('Вложения в письмах очередь не передаёт')
+            deliver.delay(message_data(message))
+        return len(email_messages)
@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+
+from core import generations
+from core.redis_server import serve_in_thread
+from posts.models import Post, User
+
+# ключи фрагментов тега {% cache %}
+FRAGMENT_PREFIX = 'template.cache.'
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает главную страницу из нескольких процессов и сравнивает '
+        'бэкенды кэша по доле попаданий и задержке'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backends', default='locmem,file,db,redis',
+            help='Бэкенды из settings.CACHE_BACKENDS через запятую',
+        )
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на один процесс',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=5,
+            help='Сколько страниц главной обходят процессы',
+        )
+        parser.add_argument(
+            '--write-every', type=int, default=50,
+            help='Каждый N-й запрос процесса имитирует новую запись',
+        )
+        parser.add_argument('--prepare', action='store_true',
+                            help=argparse.SUPPRESS)
+        parser.add_argument('--worker', action='store_true',
+                            help=argparse.SUPPRESS)
+        parser.add_argument('--cleanup', action='store_true',
+                            help=argparse.SUPPRESS)
+        parser.add_argument('--name', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['prepare']:
+            return self.prepare(options['name'], options['pages'])
+        if options['cleanup']:
+            return self.cleanup()
+        if options['worker']:
+            return self.work(options)
+        unknown = set(options['backends'].split(',')) - set(
+            settings.CACHE_BACKENDS
+        )
+        if unknown:
+            raise CommandError(f'Неизвестные бэкенды: {", ".join(unknown)}')
+        self.stdout.write(
+            f'{"бэкенд":<8} {"попадания":>10} {"p50, мс":>9} {"p99, мс":>9}'
+        )
+        for backend in options['backends'].split(','):
+            hits, lookups, latencies = self.run_backend(backend, options)
+            ratio = hits / lookups if lookups else 0
+            self.stdout.write(
+                f'{backend:<8} {ratio:>10.1%} '
+                f'{percentile(latencies, 0.5):>9.2f} '
+                f'{percentile(latencies, 0.99):>9.2f}'
+            )
+
+    def run_backend(self, backend, options):
+        env = dict(os.environ, CACHE_BACKEND=backend)
+        env.pop('CACHE_LOCATION', None)
+        env.pop('DATABASE_NAME', None)
+        server = None
+        # БД и файловый кэш — во временном каталоге: рабочие данные
+        # и настроенный кэш не затрагиваются
+        tmpdir = tempfile.mkdtemp(prefix='yatube-cache-')
+        if connection.vendor == 'sqlite':
+            name = os.path.join(tmpdir, 'bench.sqlite3')
+        else:
+            name = 'yatube_bench_cache'
+        if backend == 'file':
+            env['CACHE_LOCATION'] = os.path.join(tmpdir, 'cache')
+        elif backend == 'redis':
+            # локальная замена Redis: сервер живёт в этом процессе
+            server = serve_in_thread()
+            env['CACHE_LOCATION'] = 'redis://{}:{}/0'.format(
+                *server.server_address
+            )
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'),
+            'bench_cache',
+        ]
+        try:
+            subprocess.run(
+                command + [
+                    '--prepare', '--name', name,
+                    '--pages', str(options['pages']),
+                ],
+                env=env,
+                check=True,
+            )
+            env['DATABASE_NAME'] = name
+            workers = [
+                subprocess.Popen(
+                    command + [
+                        '--worker',
+                        '--requests', str(options['requests']),
+                        '--pages', str(options['pages']),
+                        '--write-every', str(options['write_every']),
+                    ],
+                    env=env,
+                    stdout=subprocess.PIPE,
+                )
+                for _ in range(options['workers'])
+            ]
+            results = [json.loads(w.communicate()[0]) for w in workers]
+        finally:
+            if 'DATABASE_NAME' in env:
+                subprocess.run(command + ['--cleanup'], env=env, check=True)
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        return (
+            sum(result['hits'] for result in results),
+            sum(result['lookups'] for result in results),
+            [ms for result in results for ms in result['latencies']],
+        )
+
+    def prepare(self, name, pages):
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = name
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        author = User.objects.create_user(username='author')
+        # по 10 постов на страницу главной
+        Post.objects.bulk_create([
+            Post(author=author, text=f'Пост {number}')
+            for number in range(pages * 10)
+        ])
+        if settings.CACHES['default']['BACKEND'].endswith('db.DatabaseCache'):
+            call_command('createcachetable', verbosity=0)
+        caches['default'].clear()
+
+    def cleanup(self):
+        # NAME указывает на БД бенчмарка, после удаления вернётся прежнее
+        connection.creation.destroy_test_db(
+            old_database_name=connection.settings_dict['NAME'], verbosity=0
+        )
+
+    def work(self, options):
+        backend = caches['default']
+        stats = {'hits': 0, 'lookups': 0}
+        get = backend.get
+
+        def counting_get(key, *args, **kwargs):
+            value = get(key, *args, **kwargs)
+            if FRAGMENT_PREFIX in key:
+                stats['lookups'] += 1
+                stats['hits'] += value is not None
+            return value
+
+        backend.get = counting_get
+        client = Client()
+        latencies = []
+        for number in range(options['requests']):
+            write_every = options['write_every']
+            if write_every and number and number % write_every == 0:
+                generations.bump('index')
+            page = number % options['pages'] + 1
+            started = time.perf_counter()
+            client.get('/', {'page': page})
+            latencies.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(json.dumps(dict(stats, latencies=latencies)))
@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from core.management.commands.bench_cache import percentile
+from posts.models import Comment, Post, User
+
+# окружение процессов приложения для каждого профиля
+PROFILES = {
+    'sqlite-journal': {'DATABASE_BACKEND': 'sqlite', 'SQLITE_TUNING': '0'},
+    'sqlite-wal': {'DATABASE_BACKEND': 'sqlite', 'SQLITE_TUNING': '1'},
+    'postgres': {'DATABASE_BACKEND': 'postgres'},
+}
+AUTHORS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает БД смешанными чтениями и записями из нескольких '
+        'процессов и сравнивает профили БД по пропускной способности, '
+        'задержке и числу ошибок блокировки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', default='sqlite-journal,sqlite-wal',
+            help=f'Через запятую: {", ".join(PROFILES)}',
+        )
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--operations', type=int, default=300,
+            help='Операций на один процесс',
+        )
+        parser.add_argument(
+            '--write-share', type=float, default=0.2,
+            help='Доля записей среди операций',
+        )
+        parser.add_argument('--prepare', action='store_true',
+                            help=argparse.SUPPRESS)
+        parser.add_argument('--cleanup', action='store_true',
+                            help=argparse.SUPPRESS)
+        parser.add_argument('--worker', action='store_true',
+                            help=argparse.SUPPRESS)
+        parser.add_argument('--name', help=argparse.SUPPRESS)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['prepare']:
+            return self.prepare(options['name'])
+        if options['cleanup']:
+            return self.cleanup()
+        if options['worker']:
+            return self.work(options)
+        profiles = options['profiles'].split(',')
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f'Неизвестные профили: {", ".join(unknown)}')
+        self.stdout.write(
+            f'{"профиль":<16} {"опер./с":>8} {"чтение p50/p99, мс":>20} '
+            f'{"запись p50/p99, мс":>20} {"ошибки":>7}'
+        )
+        for profile in profiles:
+            results, elapsed = self.run_profile(profile, options)
+            reads = [ms for result in results for ms in result['reads']]
+            writes = [ms for result in results for ms in result['writes']]
+            errors = sum(result['errors'] for result in results)
+            self.stdout.write(
+                f'{profile:<16} {(len(reads) + len(writes)) / elapsed:>8.0f} '
+                f'{self.latency(reads):>20} {self.latency(writes):>20} '
+                f'{errors:>7}'
+            )
+
+    def latency(self, samples):
+        if not samples:
+            return '-'
+        return (
+            f'{percentile(samples, 0.5):.1f}/{percentile(samples, 0.99):.1f}'
+        )
+
+    def run_profile(self, profile, options):
+        env = dict(os.environ, **PROFILES[profile])
+        env.pop('DATABASE_NAME', None)
+        tmpdir = None
+        if env['DATABASE_BACKEND'] == 'sqlite':
+            tmpdir = tempfile.mkdtemp(prefix='yatube-db-')
+            name = os.path.join(tmpdir, 'bench.sqlite3')
+        else:
+            name = 'yatube_bench'
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'),
+            'bench_db',
+        ]
+        # отдельная БД, рабочие данные не затрагиваются
+        subprocess.run(
+            command + ['--prepare', '--name', name], env=env, check=True
+        )
+        env['DATABASE_NAME'] = name
+        try:
+            started = time.perf_counter()
+            workers = [
+                subprocess.Popen(
+                    command + [
+                        '--worker',
+                        '--operations', str(options['operations']),
+                        '--write-share', str(options['write_share']),
+                        '--seed', str(options['seed'] + number),
+                    ],
+                    env=env,
+                    stdout=subprocess.PIPE,
+                )
+                for number in range(options['workers'])
+            ]
+            results = [json.loads(w.communicate()[0]) for w in workers]
+            elapsed = time.perf_counter() - started
+        finally:
+            subprocess.run(command + ['--cleanup'], env=env, check=True)
+            if tmpdir is not None:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+        return results, elapsed
+
+    def prepare(self, name):
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = name
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        for number in range(AUTHORS):
+            author = User.objects.create_user(username=f'author{number}')
+            Post.objects.bulk_create([
+                Post(author=author, text=f'Пост {i} автора {number}')
+                for i in range(50)
+            ])
+
+    def cleanup(self):
+        # NAME указывает на БД бенчмарка, после удаления вернётся прежнее
+        connection.creation.destroy_test_db(
+            old_database_name=connection.settings_dict['NAME'], verbosity=0
+        )
+
+    def work(self, options):
+        rng = random.Random(options['seed'])
+        authors = list(User.objects.values_list('pk', flat=True))
+        posts = list(Post.objects.values_list('pk', flat=True))
+        reads, writes, errors = [], [], 0
+        for _ in range(options['operations']):
+            write = rng.random() < options['write_share']
+            started = time.perf_counter()
+            try:
+                if write:
+                    self.write(rng, authors, posts)
+                else:
+                    self.read(rng, authors, posts)
+            except OperationalError:
+                # database is locked
+                errors += 1
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            (writes if write else reads).append(elapsed)
+        self.stdout.write(json.dumps(
+            {'reads': reads, 'writes': writes, 'errors': errors}
+        ))
+
+    def read(self, rng, authors, posts):
+        # запросы главной, профиля и страницы записи
+        list(Post.objects.for_feed()[:11])
+        list(Post.objects.filter(
+            author_id=rng.choice(authors)
+        ).for_feed()[:11])
+        list(Comment.objects.filter(
+            post_id=rng.choice(posts)
+        ).for_list()[:21])
+
+    def write(self, rng, authors, posts):
+        if rng.random() < 0.5:
+            Post.objects.create(
+                author_id=rng.choice(authors), text='Новый пост'
+            )
+        else:
+            Comment.objects.create(
+                author_id=rng.choice(authors),
+                post_id=rng.choice(posts),
+                text='Новый комментарий',
+            )
@@ -0,0 +1,149 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.management.utils import temporary_database
+from posts.models import Comment, Group, Post, User
+
+# полный просмотр таблицы без индекса: «SCAN posts_post»
+# (SQLite до 3.36 писал «SCAN TABLE posts_post»)
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+# выдача поиска упорядочена по релевантности: совпадения сортируются всегда
+EXPECTED_SORTS = ('FROM search_fts ',)
+# count() среза (core.counting) читает производную таблицу из не больше
+# LIMIT строк; план её внутреннего запроса проверяется отдельным шагом
+BOUNDED_SCAN = 'SCAN subquery'
+CURSOR_LINK = r'[?;]{}=([\w-]+)'
+
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+def bad_steps(sql):
+    """Шаги плана запроса с полным просмотром или сортировкой."""
+    sort_expected = any(part in sql for part in EXPECTED_SORTS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        steps = [row[-1] for row in cursor.fetchall()]
+    return [
+        step for step in steps
+        if FULL_SCAN.match(step) and step != BOUNDED_SCAN
+        or TEMP_SORT in step and not sort_expected
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает страницы сайта на временной БД и проверяет планы всех '
+        'SELECT: без полного просмотра таблиц и сортировки во временном '
+        'B-дереве. Завершается с ошибкой, если такие планы есть'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Планы запросов проверяются только для SQLite')
+        with temporary_database(prefix='yatube-plans-'):
+            problems = self.collect_problems()
+        for label, sql, steps in problems:
+            self.stdout.write(f'{label}: {"; ".join(steps)}\n  {sql}')
+        if problems:
+            raise CommandError(f'Запросов с неудачным планом: {len(problems)}')
+        self.stdout.write('Все запросы страниц используют индексы')
+
+    def collect_problems(self):
+        """Список (страница, SQL, плохие шаги плана) по всем запросам."""
+        # без кэша страницы каждый раз обращаются к БД,
+        # задачи выполняются сразу, чтобы попали и их запросы
+        with override_settings(CACHES=NO_CACHE, JOBS_ALWAYS_EAGER=True):
+            problems = []
+            for label, queries in self.visit():
+                for query in queries:
+                    sql = query['sql']
+                    if not sql.startswith('SELECT'):
+                        continue
+                    steps = bad_steps(sql)
+                    if steps:
+                        problems.append((label, sql, steps))
+            return problems
+
+    def visit(self):
+        """Обходит страницы и отдаёт (подпись, выполненные запросы)."""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        # по одному, чтобы сработали сигналы: счётчики, поисковый индекс
+        for number in range(25):
+            post = Post.objects.create(
+                author=author, group=group, text=f'Пост номер {number}'
+            )
+        Comment.objects.create(post=post, author=reader, text='Комментарий')
+        client = Client()
+        client.force_login(reader)
+        author_client = Client()
+        author_client.force_login(author)
+
+        def request(label, client, url, data=None, method='get'):
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, method)(url, data)
+            return label, queries, response
+
+        label, queries, _ = request(
+            'подписка', client, '/profile/author/follow/'
+        )
+        yield label, queries
+        label, queries, _ = request(
+            'новый пост', author_client, '/create/',
+            {'text': 'Новый пост', 'group': group.pk}, 'post',
+        )
+        yield label, queries
+        pages = [
+            ('главная', '/', {}),
+            ('группа', '/group/group/', {}),
+            ('профиль', '/profile/author/', {}),
+            ('подписки', '/follow/', {}),
+            ('поиск', '/search/', {'q': 'пост'}),
+        ]
+        for label, url, params in pages:
+            yield self.walk(request, client, label, url, params)
+        for label, url in (
+            ('запись', f'/posts/{post.pk}/'),
+            ('комментарии', f'/posts/{post.pk}/comments/'),
+            ('старая ссылка', '/?page=3'),
+            ('последняя страница', '/?page=last'),
+        ):
+            label, queries, _ = request(label, client, url)
+            yield label, queries
+
+    def walk(self, request, client, label, url, params):
+        """Первая страница, затем вперёд и назад по курсорам."""
+        _, first, response = request(label, client, url, params)
+        queries = list(first)
+        cursor = self.cursor(response, 'after')
+        _, after, response = request(
+            label, client, url, dict(params, after=cursor)
+        )
+        queries.extend(after)
+        cursor = self.cursor(response, 'before')
+        _, before, _ = request(
+            label, client, url, dict(params, before=cursor)
+        )
+        queries.extend(before)
+        return label, queries
+
+    def cursor(self, response, direction):
+        """Курсор из ссылки пагинатора на странице."""
+        found = re.search(
+            CURSOR_LINK.format(direction), response.content.decode()
+        )
+        if found is None:
+            raise CommandError(
+                f'{response.request["PATH_INFO"]}: нет ссылки {direction}'
+            )
+        return found.group(1)
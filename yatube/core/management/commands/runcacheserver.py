@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.redis_server import CacheServer
+
+
+class Command(BaseCommand):
+    help = 'Запускает локальный сервер кэша с протоколом Redis'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'addrport', nargs='?', default='127.0.0.1:6379',
+            help='Адрес и порт сервера, по умолчанию 127.0.0.1:6379',
+        )
+
+    def handle(self, *args, **options):
+        host, _, port = options['addrport'].rpartition(':')
+        server = CacheServer((host or '127.0.0.1', int(port)))
+        self.stdout.write(
+            'Сервер кэша запущен на {}:{}'.format(*server.server_address)
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import socket
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+def work(burst, poll_interval):
+    # при запуске через spawn дочерний процесс начинает с чистого листа
+    django.setup()
+    try:
+        jobs.work(
+            worker=f'{socket.gethostname()}:{os.getpid()}',
+            burst=burst,
+            poll_interval=poll_interval,
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count(),
+            help='Число процессов-воркеров',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Завершиться, когда очередь опустеет',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1,
+            help='Пауза между опросами пустой очереди, секунды',
+        )
+
+    def handle(self, *args, **options):
+        burst, poll_interval = options['burst'], options['poll_interval']
+        if options['processes'] <= 1:
+            work(burst, poll_interval)
+            return
+        # соединения с БД нельзя делить между процессами
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=work, args=(burst, poll_interval))
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
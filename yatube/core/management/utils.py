@@ -0,0 +1,23 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def temporary_database(prefix='yatube-'):
+    """Временная БД со всеми миграциями; рабочие данные не затрагиваются."""
+    tmpdir = tempfile.mkdtemp(prefix=prefix)
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = (
+        os.path.join(tmpdir, 'temp.sqlite3')
+    )
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(tmpdir, ignore_errors=True)
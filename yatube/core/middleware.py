@@ -0,0 +1,36 @@
+from functools import lru_cache
+
+import pytz
+from django.utils import timezone
+
+# cookie выставляет скрипт в base.html по настройкам браузера
+TIME_ZONE_COOKIE = 'timezone'
+
+
+# имя приходит из cookie: размер кэша ограничен с запасом на все пояса IANA
+@lru_cache(maxsize=1024)
+def get_zone(name):
+    """Часовой пояс по имени из базы IANA или None для неизвестного имени."""
+    try:
+        return pytz.timezone(name)
+    except (pytz.UnknownTimeZoneError, ValueError):
+        return None
+
+
+class TimezoneMiddleware:
+    """Включает часовой пояс пользователя из cookie.
+
+    Без cookie или с неизвестным поясом действует settings.TIME_ZONE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        name = request.COOKIES.get(TIME_ZONE_COOKIE)
+        zone = get_zone(name[:64]) if name else None
+        if zone is None:
+            timezone.deactivate()
+        else:
+            timezone.activate(zone)
+        return self.get_response(request)
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 
 class CreatedModel(models.Model):
@@ -9,3 +9,84 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+    def save(self, *args, **kwargs):
+        # обработчики post_save (счётчики, ленты) работают в той же
+        # транзакции, что и сама запись
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class CountersModel(models.Model):
+    """Модель с денормализованными счётчиками.
+
+    Счётчики меняются только атомарным UPDATE с F(), поэтому save()
+    существующей записи не перезаписывает их устаревшими значениями.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Job(CreatedModel):
+    """Отложенный вызов задачи, зарегистрированной декоратором @task."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'в очереди'),
+        (RUNNING, 'выполняется'),
+        (FAILED, 'ошибка'),
+    )
+
+    task = models.CharField(max_length=200, verbose_name='задача')
+    payload = models.TextField(verbose_name='аргументы')
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED,
+        verbose_name='состояние',
+    )
+    run_at = models.DateTimeField(verbose_name='запустить после')
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='попыток',
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='максимум попыток',
+    )
+    locked_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='воркер',
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='взята в работу',
+    )
+    last_error = models.TextField(blank=True, verbose_name='последняя ошибка')
+
+    class Meta:
+        ordering = ('run_at', 'id')
+        verbose_name = 'задача'
+        verbose_name_plural = 'очередь задач'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='job_status_run_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
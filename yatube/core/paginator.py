@@ -0,0 +1,235 @@
+from math import ceil
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import counting
+from .generations import get_generation
+
+CURSOR_INDEX_TIMEOUT = 60 * 60
+
+
+def encode_cursor(key, number):
+    parts = [
+        part.isoformat() if hasattr(part, 'isoformat') else str(part)
+        for part in key
+    ]
+    raw = '|'.join(parts + [str(number)])
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(token, parsers=(parse_datetime, int)):
+    """Разбирает курсор, для испорченного курсора возвращает None."""
+    try:
+        *parts, number = urlsafe_base64_decode(token).decode().split('|')
+        if len(parts) != len(parsers):
+            return None
+        key = tuple(parse(part) for parse, part in zip(parsers, parts))
+        number = int(number)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    if None in key:
+        return None
+    return key, max(number, 1)
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (created, id) в порядке убывания.
+
+    Страница выбирается условием на ключ вместо OFFSET, а общее число
+    записей не считается: о следующей странице известно по одной лишней
+    строке выборки. Номер страницы хранится в курсоре только для показа.
+
+    Старые ссылки вида ?page=N обслуживаются через кэшированный индекс
+    «номер страницы → ключ последней записи предыдущей страницы».
+    Индекс привязан к поколению области scope и сбрасывается при записи.
+    ?page=last при точном числе записей читает хвост ленты по индексу в
+    порядке возрастания ключа, без OFFSET; размер хвоста берётся из
+    числа записей, поэтому страница совпадает с ?page=N.
+
+    Общее число записей для показа считается только по обращению к
+    count: из переданного счётчика count или через core.counting.
+    """
+
+    key_parsers = (parse_datetime, int)
+
+    def __init__(self, object_list, per_page, scope=None, count=None):
+        super().__init__(object_list, per_page)
+        self.scope = scope
+        self._num_pages = 1
+        self._generation = None
+        self._count = count
+
+    @property
+    def num_pages(self):
+        """Число известных страниц: текущая и, если есть, следующая."""
+        return self._num_pages
+
+    @cached_property
+    def count_info(self):
+        """(число записей, точное ли оно)."""
+        if self._count is not None:
+            return self._count, True
+        return counting.count(self.object_list, self.scope)
+
+    @property
+    def count(self):
+        return self.count_info[0]
+
+    @property
+    def count_exact(self):
+        return self.count_info[1]
+
+    @property
+    def total_pages(self):
+        """Число страниц по count, не меньше уже известных."""
+        if self.count is None:
+            return None
+        return max(ceil(self.count / self.per_page), self._num_pages)
+
+    def get_cursor_page(self, params):
+        """Возвращает страницу по параметрам after, before или page."""
+        for direction in ('after', 'before'):
+            cursor = decode_cursor(
+                params.get(direction, ''), self.key_parsers
+            )
+            if cursor is not None:
+                key, number = cursor
+                if direction == 'after':
+                    return self._fetch_after(key, number)
+                return self._fetch_before(key, number)
+        return self.get_page(params.get('page'))
+
+    def get_page(self, number):
+        if number == 'last':
+            return self._fetch_last()
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        if number == 1:
+            return self._fetch_after(None, 1)
+        key = self._index_get(number)
+        if key is None:
+            key, number = self._seek(number)
+        return self._fetch_after(key, number)
+
+    def _index_key(self, number):
+        if self._generation is None:
+            self._generation = get_generation(self.scope)
+        return (
+            f'page-cursor:{self.scope}:{self._generation}:'
+            f'{self.per_page}:{number}'
+        )
+
+    def _index_get(self, number):
+        if self.scope is None:
+            return None
+        return cache.get(self._index_key(number))
+
+    def _index_set(self, number, key):
+        if self.scope is not None and number > 1:
+            cache.set(self._index_key(number), key, CURSOR_INDEX_TIMEOUT)
+
+    def _seek(self, number):
+        """Находит ключ начала страницы запросом с OFFSET.
+
+        OFFSET перебирает все записи предыдущих страниц, поэтому дальние
+        номера дороги; найденный ключ кэшируется в индексе страниц.
+        Для номера за последней страницей отдаёт последнюю страницу,
+        как Paginator.get_page; только в этом случае нужно число записей.
+        """
+        keys = self.object_list.order_by('-created', '-pk').values_list(
+            'created', 'pk'
+        )
+        offset = (number - 1) * self.per_page - 1
+        found = list(keys[offset:offset + 1])
+        if not found and self.count_exact:
+            number, found = self._last_page(keys, self.count)
+        if not found:
+            # приблизительное число или разошедшийся счётчик оказались
+            # больше настоящего
+            number, found = self._last_page(keys, self.object_list.count())
+        self._index_set(number, found[0])
+        return found[0], number
+
+    def _last_page(self, keys, total):
+        """Номер последней страницы и ключ её начала ([None] для первой)."""
+        number = max(ceil(total / self.per_page), 1)
+        if number == 1:
+            return 1, [None]
+        offset = (number - 1) * self.per_page - 1
+        return number, list(keys[offset:offset + 1])
+
+    def _fetch_after(self, key, number):
+        object_list = self.object_list
+        if key is not None:
+            created, pk = key
+            object_list = object_list.filter(
+                Q(created__lt=created) | Q(created=created, pk__lt=pk),
+                created__lte=created,
+            )
+        rows = list(
+            object_list.order_by('-created', '-pk')[:self.per_page + 1]
+        )
+        has_next = len(rows) > self.per_page
+        if key is None:
+            number = 1
+        return self._build_page(rows[:self.per_page], number, has_next)
+
+    def _fetch_last(self):
+        """Последняя страница в нумерации ?page=N.
+
+        Без точного числа записей хвост не совпадёт с этой нумерацией,
+        и страница ищется через _seek, как любой номер.
+        """
+        total, exact = self.count_info
+        if total is None or not exact:
+            return self.get_page(self.total_pages or 1)
+        number = max(ceil(total / self.per_page), 1)
+        if number == 1:
+            return self._fetch_after(None, 1)
+        size = total - (number - 1) * self.per_page
+        rows = list(
+            self.object_list.order_by('created', 'pk')[:size + 1]
+        )
+        if len(rows) <= size:
+            # счётчик больше настоящего числа записей
+            return self.get_page(number)
+        self._index_set(number, self._key(rows[size]))
+        return self._build_page(rows[size - 1::-1], number, False)
+
+    def _fetch_before(self, key, number):
+        created, pk = key
+        rows = list(self.object_list.filter(
+            Q(created__gt=created) | Q(created=created, pk__gt=pk),
+            created__gte=created,
+        ).order_by('created', 'pk')[:self.per_page + 1])
+        if len(rows) <= self.per_page:
+            # дошли до начала ленты: показываем полную первую страницу
+            return self._fetch_after(None, 1)
+        number = max(number, 2)
+        self._index_set(number, self._key(rows[self.per_page]))
+        return self._build_page(rows[self.per_page - 1::-1], number, True)
+
+    def _key(self, obj):
+        return obj.created, obj.pk
+
+    def _build_page(self, rows, number, has_next):
+        self._num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.next_cursor = ''
+        page.previous_cursor = ''
+        if has_next:
+            page.next_cursor = encode_cursor(self._key(rows[-1]), number + 1)
+            self._index_set(number + 1, self._key(rows[-1]))
+        if number > 1 and rows:
+            page.previous_cursor = encode_cursor(
+                self._key(rows[0]), number - 1
+            )
+        return page
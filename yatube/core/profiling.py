@@ -0,0 +1,198 @@
+"""Выборочное профилирование запросов: SQL, шаблоны, общее время.
+
+Замеры складываются в кольцевой буфер в кэше default и сводятся по
+именам URL на странице /admin/profiling/. Буфер общий для процессов
+приложения, только если общий сам кэш (Redis): с LocMemCache у каждого
+процесса свой буфер, и страница показывает запросы одного процесса.
+Запросы к БД из потоков gather() попадают в профиль вызвавшего их view.
+Без выборки (PROFILING_SAMPLE_RATE = 0) middleware только вызывает
+следующий обработчик.
+"""
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+CURSOR_KEY = 'profiling:cursor'
+
+_local = threading.local()
+
+
+def _slot_key(slot):
+    return f'profiling:slot:{slot}'
+
+
+class Profile:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = Counter()
+        # время запросов из потоков gather() суммируется с остальными
+        self.db_time = 0
+        self.template_time = 0
+        self.template_depth = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        # обёртка connection.execute_wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.db_time += elapsed
+                self.queries[sql] += 1
+
+    @property
+    def duplicates(self):
+        """Повторы одного и того же SQL с разными параметрами: N+1."""
+        return sum(count - 1 for count in self.queries.values())
+
+
+def propagate(function):
+    """Функция для другого потока: её запросы к БД попадут в профиль
+    текущего запроса, если он профилируется."""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return function
+
+    def wrapper():
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            return function()
+    return wrapper
+
+
+class ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = getattr(_local, 'profile', None)
+        if profile is None:
+            return super().render(context, request)
+        # render_to_string внутри шаблона не считается дважды
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_time += time.perf_counter() - started
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django, время отрисовки которых попадает в профиль."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(
+            self.engine.from_string(template_code), self
+        )
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return ProfiledTemplate(template.template, self)
+
+
+def store(record):
+    """Кладёт замер в кольцевой буфер на PROFILING_BUFFER_SIZE записей."""
+    cache.add(CURSOR_KEY, 0, None)
+    slot = cache.incr(CURSOR_KEY) % settings.PROFILING_BUFFER_SIZE
+    cache.set(_slot_key(slot), record, None)
+
+
+def records():
+    keys = [_slot_key(slot) for slot in range(settings.PROFILING_BUFFER_SIZE)]
+    return list(cache.get_many(keys).values())
+
+
+def clear():
+    cache.delete_many(
+        [CURSOR_KEY]
+        + [_slot_key(slot) for slot in range(settings.PROFILING_BUFFER_SIZE)]
+    )
+
+
+def report():
+    """Сводка по именам URL, самые медленные в среднем сверху."""
+    groups = {}
+    for record in records():
+        groups.setdefault(record['view'], []).append(record)
+    rows = []
+    for view, group in groups.items():
+        totals = [record['total'] for record in group]
+        rows.append({
+            'view': view,
+            'requests': len(group),
+            'total': statistics.mean(totals),
+            'total_p95': sorted(totals)[int(len(totals) * 0.95)],
+            'db': statistics.mean(record['db'] for record in group),
+            'template': statistics.mean(
+                record['template'] for record in group
+            ),
+            'queries': statistics.mean(
+                record['queries'] for record in group
+            ),
+            'max_queries': max(record['queries'] for record in group),
+            'duplicates': statistics.mean(
+                record['duplicates'] for record in group
+            ),
+            'worst_sql': max(
+                (record for record in group if record['duplicate_sql']),
+                key=lambda record: record['duplicates'],
+                default={'duplicate_sql': ''},
+            )['duplicate_sql'],
+        })
+    return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.PROFILING_SAMPLE_RATE
+        if rate <= 0 or rate < 1 and random.random() >= rate:
+            return self.get_response(request)
+        profile = Profile()
+        _local.profile = profile
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _local.profile = None
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        duplicated = profile.queries.most_common(1)
+        store({
+            'view': match.view_name if match else '<unresolved>',
+            'path': request.path,
+            'status': response.status_code,
+            'total': total * 1000,
+            'db': profile.db_time * 1000,
+            'template': profile.template_time * 1000,
+            'queries': sum(profile.queries.values()),
+            'duplicates': profile.duplicates,
+            'duplicate_sql': (
+                duplicated[0][0]
+                if duplicated and duplicated[0][1] > 1 else ''
+            ),
+        })
+        if settings.PROFILING_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={profile.db_time * 1000:.1f};'
+                f'desc="{sum(profile.queries.values())} queries", '
+                f'tpl;dur={profile.template_time * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}'
+            )
+        return response
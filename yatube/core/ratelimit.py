@@ -0,0 +1,112 @@
+"""Ограничение частоты запросов корзинами токенов в кэше.
+
+Корзина клиента — одно число в кэше: время, к которому она наполнится
+снова (алгоритм GCRA). Каждый запрос сдвигает его атомарным
+cache.incr() на стоимость токена; если время ушло дальше, чем вмещает
+корзина, запрос отклоняется и токен возвращается. Ключ живёт, пока
+корзина не полна, поэтому простой не копит токенов сверх ёмкости.
+
+Для нескольких процессов кэш должен быть общим и с атомарным incr():
+redis подходит, file и db — нет (у них incr() — это get и set).
+"""
+import math
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+RATE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60), '5/10s' -> (5, 10): токенов за секунд."""
+    match = RATE.match(rate)
+    if match is None:
+        raise ValueError(f'Неверный лимит: {rate}')
+    tokens, count, unit = match.groups()
+    return int(tokens), int(count or 1) * UNITS[unit]
+
+
+def hit(key, rate):
+    """Берёт токен из корзины key.
+
+    Возвращает 0, если токен был, иначе секунды до следующего токена.
+    Корзина вмещает столько токенов, сколько даёт rate за период.
+    """
+    tokens, period = parse_rate(rate)
+    cost = period * 10 ** 6 // tokens
+    capacity = cost * tokens
+    now = time.time_ns() // 1000
+    if cache.add(key, now + cost, cost / 10 ** 6):
+        return 0
+    try:
+        full_at = cache.incr(key, cost)
+    except ValueError:
+        # ключ истёк между add() и incr(): корзина уже полна
+        cache.add(key, now + cost, cost / 10 ** 6)
+        return 0
+    excess = full_at - now - capacity
+    if excess > 0:
+        cache.decr(key, cost)
+        return math.ceil(excess / 10 ** 6)
+    cache.touch(key, (full_at - now) / 10 ** 6)
+    return 0
+
+
+def client_key(request):
+    """Пользователь, а для гостя — адрес клиента."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{request.META.get("REMOTE_ADDR", "")}'
+
+
+def check(request, scope):
+    """Секунды ожидания по лимиту RATE_LIMITS[scope] или 0."""
+    rate = settings.RATE_LIMITS.get(scope)
+    if not settings.RATE_LIMIT_ENABLED or not rate:
+        return 0
+    return hit(f'ratelimit:{scope}:{client_key(request)}', rate)
+
+
+def too_many_requests(request, wait):
+    response = render(
+        request, 'core/429.html', {'wait': wait}, status=429
+    )
+    response['Retry-After'] = wait
+    return response
+
+
+def ratelimit(scope, methods=None):
+    """Декоратор view с лимитом RATE_LIMITS[scope] на клиента.
+
+    methods — какие методы считать; по умолчанию все.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                wait = check(request, scope)
+                if wait:
+                    return too_many_requests(request, wait)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RateLimitMiddleware:
+    """Общий лимит RATE_LIMITS['default'] на все изменяющие запросы."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            wait = check(request, 'default')
+            if wait:
+                return too_many_requests(request, wait)
+        return self.get_response(request)
@@ -0,0 +1,237 @@
+"""Бэкенд кэша для серверов с протоколом Redis (RESP).
+
+Django 2.2 не содержит Redis-бэкенда, поэтому здесь минимальный клиент
+без внешних зависимостей. Целые числа хранятся как есть, чтобы incr()
+выполнялся атомарно на сервере, остальные значения сериализуются pickle.
+
+Настройка:
+    CACHES = {'default': {
+        'BACKEND': 'core.redis_cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/0',
+    }}
+"""
+import os
+import pickle
+import socket
+import threading
+from urllib.parse import urlparse
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class RedisError(Exception):
+    pass
+
+
+def encode_command(*args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    """Читает один ответ RESP из файлового объекта сокета."""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError('соединение с сервером кэша закрыто')
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload.decode()
+    if kind == b'-':
+        return RedisError(payload.decode())
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length == -1:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        length = int(payload)
+        if length == -1:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise RedisError(f'неизвестный ответ сервера: {line!r}')
+
+
+class Connection:
+    def __init__(self, host, port, db, timeout):
+        self.pid = os.getpid()
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    def execute_many(self, *commands):
+        self.sock.sendall(b''.join(encode_command(*c) for c in commands))
+        replies = [read_reply(self.stream) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def execute(self, *args):
+        return self.execute_many(args)[0]
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+def dumps(value):
+    if type(value) is int:
+        return str(value).encode()
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def loads(data):
+    try:
+        return int(data)
+    except ValueError:
+        return pickle.loads(data)
+
+
+class RedisCache(BaseCache):
+    def __init__(self, server, params):
+        super().__init__(params)
+        url = urlparse(server if '://' in server else f'redis://{server}')
+        self.host = url.hostname or '127.0.0.1'
+        self.port = url.port or 6379
+        self.db = int(url.path.strip('/') or 0)
+        self.socket_timeout = params.get('OPTIONS', {}).get(
+            'SOCKET_TIMEOUT', 5
+        )
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        # после fork() сокет родителя использовать нельзя
+        if connection is None or connection.pid != os.getpid():
+            connection = Connection(
+                self.host, self.port, self.db, self.socket_timeout
+            )
+            self._local.connection = connection
+        return connection
+
+    def _execute_many(self, *commands):
+        try:
+            return self._connection().execute_many(*commands)
+        except (ConnectionError, socket.timeout, OSError):
+            # соединение могло оборваться между запросами: одна попытка
+            # переподключения
+            self._disconnect()
+            return self._connection().execute_many(*commands)
+
+    def _execute(self, *args):
+        return self._execute_many(args)[0]
+
+    def _expiry_args(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return ()
+        return ('PX', max(int(timeout * 1000), 1))
+
+    def _expired(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return timeout is not None and timeout <= 0
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if self._expired(timeout):
+            return False
+        key = self._key(key, version)
+        reply = self._execute(
+            'SET', key, dumps(value), *self._expiry_args(timeout), 'NX'
+        )
+        return reply == 'OK'
+
+    def get(self, key, default=None, version=None):
+        data = self._execute('GET', self._key(key, version))
+        return default if data is None else loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        if self._expired(timeout):
+            self._execute('DEL', key)
+            return
+        self._execute('SET', key, dumps(value), *self._expiry_args(timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry_args(timeout)
+        if not expiry:
+            return bool(self._execute('PERSIST', key)) or self.has_key(key)
+        return bool(self._execute('PEXPIRE', key, expiry[1]))
+
+    def delete(self, key, version=None):
+        return bool(self._execute('DEL', self._key(key, version)))
+
+    def has_key(self, key, version=None):
+        return bool(self._execute('EXISTS', self._key(key, version)))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._execute(
+            'MGET', *[self._key(key, version) for key in keys]
+        )
+        return {
+            key: loads(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if not data:
+            return []
+        expiry = self._expiry_args(timeout)
+        self._execute_many(*[
+            ('SET', self._key(key, version), dumps(value), *expiry)
+            for key, value in data.items()
+        ])
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute('DEL', *keys)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        # EXISTS и INCRBY в одной транзакции: incr() по отсутствующему
+        # ключу должен вызывать ValueError, а не создавать ключ
+        replies = self._execute_many(
+            ('MULTI',), ('EXISTS', key), ('INCRBY', key, delta), ('EXEC',)
+        )
+        exists, value = replies[-1]
+        if isinstance(value, RedisError):
+            raise ValueError(f'значение ключа {key!r} не является числом')
+        if not exists:
+            self._execute('DEL', key)
+            raise ValueError(f'ключ {key!r} не найден')
+        return value
+
+    def clear(self):
+        self._execute('FLUSHDB')
+
+    def close(self, **kwargs):
+        # Django закрывает кэши после каждого запроса; соединение
+        # оставляем открытым, как постоянное соединение с БД
+        pass
+
+    def _disconnect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
@@ -0,0 +1,192 @@
+"""Минимальный сервер с протоколом Redis для локальной разработки.
+
+Поддерживает только команды, которые использует core.redis_cache, и
+хранит данные в памяти процесса. Позволяет запустить несколько
+процессов приложения с общим кэшем без установки настоящего Redis:
+
+    python manage.py runcacheserver 127.0.0.1:6379
+"""
+import socketserver
+import threading
+import time
+
+from .redis_cache import RedisError, read_reply
+
+
+def _now_ms():
+    return time.monotonic() * 1000
+
+
+def encode_reply(value):
+    if value is None:
+        return b'$-1\r\n'
+    if isinstance(value, RedisError):
+        return b'-%s\r\n' % str(value).encode()
+    if isinstance(value, str):
+        return b'+%s\r\n' % value.encode()
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    return b'*%d\r\n' % len(value) + b''.join(
+        encode_reply(item) for item in value
+    )
+
+
+class Database:
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+
+    def _alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= _now_ms():
+            del self.data[key]
+            del self.expires[key]
+        return key in self.data
+
+    def get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def set(self, key, value, px=None):
+        self.data[key] = value
+        if px is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = _now_ms() + px
+
+    def delete(self, key):
+        alive = self._alive(key)
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+        return alive
+
+    def size(self):
+        return sum(self._alive(key) for key in list(self.data))
+
+
+class Store:
+    """Данные всех баз сервера; команды выполняются под общей блокировкой."""
+
+    def __init__(self, databases=16):
+        self.databases = [Database() for _ in range(databases)]
+        self.lock = threading.Lock()
+
+    def execute(self, db, name, args):
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            return RedisError(f"ERR unknown command '{name}'")
+        try:
+            return handler(self.databases[db], *args)
+        except (TypeError, ValueError, IndexError):
+            return RedisError(f"ERR wrong arguments for '{name}' command")
+
+    def cmd_ping(self, db, message=None):
+        return 'PONG' if message is None else message
+
+    def cmd_get(self, db, key):
+        return db.get(key)
+
+    def cmd_set(self, db, key, value, *options):
+        options = [option.upper() for option in options]
+        px = None
+        for unit, factor in ((b'EX', 1000), (b'PX', 1)):
+            if unit in options:
+                px = int(options[options.index(unit) + 1]) * factor
+        exists = db.get(key) is not None
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        db.set(key, value, px)
+        return 'OK'
+
+    def cmd_mget(self, db, *keys):
+        return [db.get(key) for key in keys]
+
+    def cmd_del(self, db, *keys):
+        return sum(db.delete(key) for key in keys)
+
+    def cmd_exists(self, db, *keys):
+        return sum(db.get(key) is not None for key in keys)
+
+    def cmd_incrby(self, db, key, delta):
+        value = db.get(key)
+        try:
+            value = int(value or 0) + int(delta)
+        except ValueError:
+            return RedisError('ERR value is not an integer or out of range')
+        db.data[key] = str(value).encode()
+        return value
+
+    def cmd_pexpire(self, db, key, px):
+        if db.get(key) is None:
+            return 0
+        db.expires[key] = _now_ms() + int(px)
+        return 1
+
+    def cmd_persist(self, db, key):
+        if db.get(key) is None:
+            return 0
+        return int(db.expires.pop(key, None) is not None)
+
+    def cmd_dbsize(self, db):
+        return db.size()
+
+    def cmd_flushdb(self, db):
+        db.data.clear()
+        db.expires.clear()
+        return 'OK'
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        store = self.server.store
+        db = 0
+        queue = None
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except (ConnectionError, OSError):
+                return
+            if not isinstance(command, list) or not command:
+                return
+            name = command[0].decode().upper()
+            args = command[1:]
+            if name == 'QUIT':
+                self.wfile.write(encode_reply('OK'))
+                return
+            if name == 'SELECT':
+                db = int(args[0])
+                reply = 'OK'
+            elif name == 'MULTI':
+                queue = []
+                reply = 'OK'
+            elif name == 'EXEC':
+                with store.lock:
+                    reply = [
+                        store.execute(db, *queued) for queued in queue or ()
+                    ]
+                queue = None
+            elif queue is not None:
+                queue.append((name, args))
+                reply = 'QUEUED'
+            else:
+                with store.lock:
+                    reply = store.execute(db, name, args)
+            self.wfile.write(encode_reply(reply))
+
+
+class CacheServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, RequestHandler)
+        self.store = Store()
+
+
+def serve_in_thread(host='127.0.0.1', port=0):
+    """Запускает сервер в фоновом потоке; для тестов и бенчмарков."""
+    server = CacheServer((host, port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
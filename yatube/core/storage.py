@@ -0,0 +1,53 @@
+"""Хранилище файлов по хэшу содержимого.
+
+Файл сохраняется под именем <каталог upload_to>/ab/cd/<sha256>.<расш.>,
+где ab и cd — первые байты хэша: в каждом каталоге не больше 256
+подкаталогов, и поиск по каталогу не замедляется с числом файлов.
+Одинаковые загрузки хранятся одним файлом, а миниатюры sorl, которые
+кэшируются по имени исходника, у них тоже общие. Поэтому файл нельзя
+удалять вместе с записью: на него могут ссылаться другие.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CONTENT_NAME = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$'
+)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content):
+        """Имя файла по sha256 содержимого в каталоге исходного имени."""
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}'
+        ).replace('\\', '/')
+
+    def is_content_name(self, name):
+        return CONTENT_NAME.search(name) is not None
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # такой файл уже загружали
+            return name
+        # при одновременной загрузке одинаковых файлов второй получит
+        # суффикс от get_available_name: лишняя копия, но не ошибка
+        return super().save(name, content, max_length)
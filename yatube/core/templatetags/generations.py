@@ -0,0 +1,17 @@
+from django import template
+
+from core.generations import get_generation
+
+register = template.Library()
+
+
+@register.simple_tag
+def generation(*scopes, **ids):
+    """Поколение областей для vary_on тега cache.
+
+    Именованные аргументы задают области объектов:
+    {% generation 'groups' group=group.pk as gen %} — это области
+    'groups' и 'group:<pk>'.
+    """
+    scopes += tuple(f'{name}:{pk}' for name, pk in sorted(ids.items()))
+    return get_generation(*scopes)
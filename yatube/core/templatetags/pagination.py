@@ -0,0 +1,45 @@
+from django import template
+
+register = template.Library()
+
+
+def window(number, total, size=2):
+    """Номера страниц вокруг текущей: первая, последняя и size соседей.
+
+    None — пропуск. Длина списка не больше 2 * size + 5 при любом total;
+    total=None — число страниц неизвестно, тогда только первая и текущая.
+    """
+    if total is None:
+        return [1, None, number] if number > 2 else list(range(1, number + 1))
+    total = max(total, number)
+    start = max(number - size, 1)
+    end = min(number + size, total)
+    pages = []
+    if start > 1:
+        pages.append(1)
+    if start > 2:
+        # пропуск в одну страницу короче показать номером
+        pages.append(2 if start == 3 else None)
+    pages.extend(range(start, end + 1))
+    if end < total - 1:
+        pages.append(total - 1 if end == total - 2 else None)
+    if end < total:
+        pages.append(total)
+    return pages
+
+
+@register.simple_tag
+def page_window(page, size=2):
+    """Окно номеров страниц для paginator.html: (номер, приблизительный).
+
+    Число страниц берётся из total_pages CursorPaginator, если оно
+    есть, иначе из num_pages обычного Paginator; приблизительным
+    бывает только номер последней страницы.
+    """
+    paginator = page.paginator
+    total = getattr(paginator, 'total_pages', paginator.num_pages)
+    exact = getattr(paginator, 'count_exact', True)
+    return [
+        (number, not exact and number == total and number != page.number)
+        for number in window(page.number, total, size)
+    ]
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Запуск тестов, в котором задачи без очереди выполняются сразу.
+
+    TestCase откатывает транзакцию теста, и transaction.on_commit в нём
+    не срабатывает никогда.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.JOBS_EAGER_ON_COMMIT = False
@@ -1,7 +1,49 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import skipIf
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.utils import ConnectionHandler
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.timezone import utc
 
 from http import HTTPStatus
 
+from posts.models import Post, User
+
+from . import concurrency, counting, generations, jobs, profiling, ratelimit
+from .asgi import get_asgi_application
+from .management.commands import check_query_plans
+from .middleware import TIME_ZONE_COOKIE
+from .paginator import CursorPaginator
+from .models import Job
+from .templatetags.pagination import page_window, window
+from .redis_cache import RedisCache
+from .redis_server import serve_in_thread
+
+CALLS = []
+
+
+@jobs.task
+def record(*args, **kwargs):
+    CALLS.append((args, kwargs))
+
+
+@jobs.task(max_attempts=2)
+def fail():
+    raise RuntimeError('сбой')
+
 
 class ViewTestClass(TestCase):
     def test_error_page_template(self):
@@ -11,3 +53,557 @@ class ViewTestClass(TestCase):
     def test_error_page_status_code(self):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class RedisCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = serve_in_thread()
+        cls.cache = RedisCache(
+            'redis://{}:{}/1'.format(*cls.server.server_address), {}
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cache._disconnect()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.cache.clear()
+
+    def test_set_get_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertTrue(self.cache.has_key('key'))
+        self.assertTrue(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_add_does_not_overwrite(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_incr(self):
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.incr('counter', 5), 6)
+        self.assertEqual(self.cache.decr('counter'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.assertFalse(self.cache.has_key('missing'))
+
+    def test_many(self):
+        self.cache.set_many({'a': 1, 'b': 'two'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'two'}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_expiry(self):
+        self.cache.set('short', 'value', timeout=0.05)
+        self.cache.set('forever', 'value', timeout=None)
+        self.cache.set('gone', 'value', timeout=0)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+        self.assertIsNone(self.cache.get('gone'))
+
+    def test_reconnects_after_connection_loss(self):
+        self.cache.set('key', 'value')
+        self.cache._connection().sock.close()
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_shared_between_clients(self):
+        other = RedisCache(
+            'redis://{}:{}/1'.format(*self.server.server_address), {}
+        )
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+        other._disconnect()
+
+
+@override_settings(JOBS_ALWAYS_EAGER=False)
+class JobsTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delay_queues_job(self):
+        job = record.delay(1, flag=True)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(CALLS, [])
+        self.assertEqual(jobs.work(burst=True), 1)
+        self.assertEqual(CALLS, [((1,), {'flag': True})])
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_ALWAYS_EAGER=True)
+    def test_eager_runs_immediately(self):
+        self.assertIsNone(record.delay(2))
+        self.assertEqual(CALLS, [((2,), {})])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = fail.delay()
+        jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('RuntimeError', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        # повтор ещё не наступил
+        self.assertEqual(jobs.work(burst=True), 0)
+        Job.objects.update(run_at=timezone.now())
+        jobs.work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_retry_delay_grows(self):
+        self.assertLess(jobs.retry_delay(1), jobs.retry_delay(2))
+        self.assertLessEqual(jobs.retry_delay(30), timedelta(hours=1))
+
+    def test_job_is_claimed_once(self):
+        record.delay()
+        self.assertIsNotNone(jobs.claim('first'))
+        self.assertIsNone(jobs.claim('second'))
+
+    def test_stale_running_job_is_requeued(self):
+        record.delay()
+        jobs.claim('crashed')
+        Job.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(jobs.work(burst=True), 1)
+        self.assertEqual(len(CALLS), 1)
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_email_is_sent_by_worker(self):
+        mail.send_mail('Тема', 'Текст', 'from@example.com', ['to@example.com'])
+        self.assertEqual(mail.outbox, [])
+        jobs.work(burst=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Тема')
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_queued_email_is_json(self):
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            reply_to=['reply@example.com'], headers={'X-Tag': 'reset'},
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.send()
+        json.loads(Job.objects.get().payload)
+        jobs.work(burst=True)
+        sent = mail.outbox[0]
+        self.assertEqual(sent.reply_to, ['reply@example.com'])
+        self.assertEqual(sent.extra_headers, {'X-Tag': 'reset'})
+        self.assertEqual(sent.alternatives, [('<p>Текст</p>', 'text/html')])
+
+
+@override_settings(JOBS_ALWAYS_EAGER=True, JOBS_EAGER_ON_COMMIT=True)
+class EagerJobsTests(TransactionTestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_eager_job_waits_for_commit(self):
+        with transaction.atomic():
+            record.delay(3)
+            self.assertEqual(CALLS, [])
+        self.assertEqual(CALLS, [((3,), {})])
+
+    def test_eager_job_error_is_logged(self):
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertIsNone(fail.delay())
+
+
+class TimezoneMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(text='test text', author=user)
+        Post.objects.filter(pk=cls.post.pk).update(
+            created=datetime(2022, 1, 1, 22, 30, tzinfo=utc)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_index(self, zone=None):
+        if zone is not None:
+            self.client.cookies[TIME_ZONE_COOKIE] = zone
+        return self.client.get('/')
+
+    def test_dates_rendered_in_cookie_timezone(self):
+        self.assertContains(self.get_index(), '01 января 2022 22:30')
+        response = self.get_index('Asia/Vladivostok')
+        self.assertContains(response, '02 января 2022 08:30')
+        self.assertEqual(response.context['TIME_ZONE'], 'Asia/Vladivostok')
+
+    def test_unknown_timezone_falls_back_to_default(self):
+        response = self.get_index('Mars/Olympus')
+        self.assertContains(response, '01 января 2022 22:30')
+
+
+class QueryPlanTests(TestCase):
+    def test_pages_use_indexes(self):
+        problems = check_query_plans.Command().collect_problems()
+        self.assertEqual(problems, [])
+
+
+@skipIf(connection.vendor != 'sqlite', 'настройки только для SQLite')
+class SqlitePragmasTests(TestCase):
+    def test_new_connection_is_tuned(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            connections = ConnectionHandler({'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(tmpdir, 'db.sqlite3'),
+            }})
+            pragmas = {}
+            with connections['default'].cursor() as cursor:
+                for name in ('journal_mode', 'synchronous', 'busy_timeout'):
+                    cursor.execute(f'PRAGMA {name}')
+                    pragmas[name] = cursor.fetchone()[0]
+            connections['default'].close()
+        # synchronous = NORMAL
+        self.assertEqual(
+            pragmas,
+            {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000},
+        )
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SERVER_TIMING=True)
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_user(
+            username='admin', is_staff=True, is_superuser=True
+        )
+        Post.objects.create(text='test text', author=cls.admin)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sampled_request_is_recorded(self):
+        response = self.client.get('/')
+        self.assertIn('desc="', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        [row] = profiling.report()
+        self.assertEqual(row['view'], 'posts:index')
+        self.assertEqual(row['requests'], 1)
+        self.assertGreater(row['queries'], 0)
+        self.assertGreater(row['template'], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_nothing_recorded_without_sampling(self):
+        response = self.client.get('/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(profiling.records(), [])
+
+    @override_settings(PROFILING_BUFFER_SIZE=2)
+    def test_buffer_keeps_latest_records(self):
+        for _ in range(3):
+            self.client.get(reverse('about:author'))
+        self.assertEqual(len(profiling.records()), 2)
+
+    def test_repeated_queries_are_counted(self):
+        profile = profiling.Profile()
+        with connection.execute_wrapper(profile):
+            list(User.objects.all())
+            for pk in range(3):
+                list(Post.objects.filter(pk=pk))
+        self.assertEqual(sum(profile.queries.values()), 4)
+        self.assertEqual(profile.duplicates, 2)
+
+    def test_report_is_for_staff_only(self):
+        user = User.objects.create_user(username='user')
+        self.client.force_login(user)
+        response = self.client.get(reverse('profiling'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        self.client.force_login(self.admin)
+        self.client.get('/')
+        response = self.client.get(reverse('profiling'))
+        self.assertContains(response, 'posts:index')
+
+
+# воркер для проверки лимита из нескольких процессов
+WORKER = """
+import django
+django.setup()
+from core.ratelimit import hit
+print(sum(not hit('ratelimit:shared', '10/h') for _ in range(20)))
+"""
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate('10/m'), (10, 60))
+        self.assertEqual(ratelimit.parse_rate('5/10s'), (5, 10))
+        with self.assertRaises(ValueError):
+            ratelimit.parse_rate('10 per minute')
+
+    def test_bucket_empties_and_refills(self):
+        allowed = [ratelimit.hit('bucket', '10/s') for _ in range(11)]
+        self.assertEqual(allowed[:10], [0] * 10)
+        self.assertEqual(allowed[10], 1)
+        time.sleep(0.15)
+        self.assertEqual(ratelimit.hit('bucket', '10/s'), 0)
+        self.assertEqual(ratelimit.hit('bucket', '10/s'), 1)
+
+    @override_settings(RATE_LIMITS={'add_comment': '2/m'})
+    def test_view_limit_per_user(self):
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(text='test text', author=author)
+        url = reverse('posts:add_comment', kwargs={'post_id': post.pk})
+        self.client.force_login(author)
+        for _ in range(2):
+            self.client.post(url, {'text': 'комментарий'})
+        response = self.client.post(url, {'text': 'комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(post.comments.count(), 2)
+        # у другого пользователя своя корзина
+        self.client.force_login(User.objects.create_user(username='other'))
+        response = self.client.post(url, {'text': 'комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    @override_settings(RATE_LIMITS={'default': '1/m'})
+    def test_middleware_limits_guest_writes_by_ip(self):
+        login = reverse('users:login')
+        self.client.post(login, {'username': 'x', 'password': 'y'})
+        response = self.client.post(login, {'username': 'x', 'password': 'y'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(login).status_code, HTTPStatus.OK)
+        response = self.client.post(
+            login, {'username': 'x', 'password': 'y'},
+            REMOTE_ADDR='10.0.0.2',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_limit_holds_across_processes(self):
+        server = serve_in_thread()
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE='yatube.settings',
+            CACHE_BACKEND='redis',
+            CACHE_LOCATION='redis://{}:{}/2'.format(*server.server_address),
+        )
+        try:
+            workers = [
+                subprocess.Popen(
+                    [sys.executable, '-c', WORKER],
+                    cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE,
+                )
+                for _ in range(4)
+            ]
+            allowed = [int(w.communicate()[0]) for w in workers]
+        finally:
+            server.shutdown()
+            server.server_close()
+        # 4 процесса по 20 запросов делят одну корзину на 10 токенов
+        self.assertEqual(sum(allowed), 10)
+
+
+# пул ASGI-приложения выполняет запросы в своих потоках, со своими
+# соединениями с БД: данные теста должны быть закоммичены
+class AsgiTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='пост через ASGI')
+        self.application = get_asgi_application()
+
+    def tearDown(self):
+        self.application.executor.shutdown()
+
+    def request(self, method, path, body=b'', headers=()):
+        messages = [{'type': 'http.request', 'body': body}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application({
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'), *headers
+            ],
+            'client': ('127.0.0.1', 5000),
+            'server': ('testserver', 80),
+        }, receive, send))
+        start, *chunks = sent
+        return start, b''.join(chunk['body'] for chunk in chunks)
+
+    def test_get_page(self):
+        start, body = self.request('GET', '/')
+        self.assertEqual(start['status'], HTTPStatus.OK)
+        self.assertIn('пост через ASGI', body.decode())
+
+    def test_post_form(self):
+        self.author.set_password('secret')
+        self.author.save()
+        token = 'a' * 32
+        start, _ = self.request(
+            'POST', reverse('users:login'),
+            body=f'username=author&password=secret'
+                 f'&csrfmiddlewaretoken={token}'.encode(),
+            headers=[
+                (b'content-type', b'application/x-www-form-urlencoded'),
+                (b'cookie', f'csrftoken={token}'.encode()),
+            ],
+        )
+        self.assertEqual(start['status'], HTTPStatus.FOUND)
+        self.assertIn((b'location', b'/'), start['headers'])
+
+    def test_lifespan(self):
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
+
+
+class GatherTests(TransactionTestCase):
+    def test_sequential_without_threads(self):
+        self.assertEqual(concurrency.gather(lambda: 1, lambda: 2), [1, 2])
+
+    @override_settings(VIEW_THREADS=4)
+    def test_threads_run_queries_together(self):
+        User.objects.create_user(username='author')
+        started = time.perf_counter()
+        results = concurrency.gather(*[
+            lambda: (time.sleep(0.1), User.objects.count())[1]
+        ] * 3)
+        self.assertEqual(results, [1, 1, 1])
+        self.assertLess(time.perf_counter() - started, 0.25)
+
+    @override_settings(VIEW_THREADS=4)
+    def test_error_is_raised_in_caller(self):
+        def missing():
+            return User.objects.get(username='missing')
+
+        with self.assertRaises(User.DoesNotExist):
+            concurrency.gather(lambda: 1, missing)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_thread_queries_are_profiled(self):
+        author = User.objects.create_user(username='author')
+        url = reverse('posts:profile', args=[author.username])
+        queries = []
+        for threads in (0, 4):
+            with self.subTest(threads=threads):
+                cache.clear()
+                with override_settings(VIEW_THREADS=threads):
+                    self.client.get(url)
+                [record] = profiling.records()
+                queries.append(record['queries'])
+        self.assertEqual(queries[0], queries[1])
+
+
+@override_settings(COUNT_EXACT_LIMIT=3)
+class CountingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def create_posts(self, count):
+        # в обход сигналов: поколения областей не меняются
+        Post.objects.bulk_create([
+            Post(text=f'test text {number}', author=CountingTests.author)
+            for number in range(count)
+        ])
+
+    def test_exact_below_limit(self):
+        self.create_posts(3)
+        self.assertEqual(counting.count(Post.objects.all()), (3, True))
+
+    def test_exact_count_is_cached_until_scope_changes(self):
+        self.create_posts(2)
+        counting.count(Post.objects.all(), 'index')
+        self.create_posts(1)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                counting.count(Post.objects.all(), 'index'), (2, True)
+            )
+        generations.bump('index')
+        self.assertEqual(
+            counting.count(Post.objects.all(), 'index'), (3, True)
+        )
+
+    def test_approximate_count_is_cached_for_timeout(self):
+        self.create_posts(5)
+        posts = Post.objects.filter(author=CountingTests.author)
+        self.assertEqual(counting.count(posts, 'author:1'), (5, False))
+        self.create_posts(1)
+        generations.bump('author:1')
+        with self.assertNumQueries(0):
+            self.assertEqual(counting.count(posts, 'author:1'), (5, False))
+
+    @skipIf(connection.vendor != 'sqlite', 'статистика sqlite_stat1')
+    def test_whole_table_is_estimated_from_statistics(self):
+        self.create_posts(5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE posts_post')
+        self.create_posts(1)
+        self.assertEqual(counting.table_estimate(Post), 5)
+        # оценка не меньше того, что насчитал COUNT с LIMIT
+        self.assertEqual(counting.count(Post.objects.all()), (5, False))
+
+
+class PageWindowTests(TestCase):
+    def test_window(self):
+        cases = {
+            (1, 1): [1],
+            (1, 3): [1, 2, 3],
+            (1, 10000): [1, 2, 3, None, 10000],
+            (4, 10000): [1, 2, 3, 4, 5, 6, None, 10000],
+            (5000, 10000): [
+                1, None, 4998, 4999, 5000, 5001, 5002, None, 10000
+            ],
+            (9998, 10000): [1, None, 9996, 9997, 9998, 9999, 10000],
+            # число страниц неизвестно: выдача поиска
+            (1, None): [1],
+            (5, None): [1, None, 5],
+        }
+        for (number, total), expected in cases.items():
+            with self.subTest(number=number, total=total):
+                self.assertEqual(window(number, total), expected)
+
+    def test_approximate_last_page(self):
+        posts = Post.objects.all()
+        paginator = CursorPaginator(posts, 10, count=100000)
+        page = paginator.get_cursor_page({})
+        self.assertEqual(page_window(page)[-1], (10000, False))
+        paginator.count_info = (100000, False)
+        self.assertEqual(page_window(page)[-1], (10000, True))
@@ -1,4 +1,9 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_http_methods
+
+from . import profiling
 
 
 def page_not_found(request, exception):
@@ -15,3 +20,17 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def profiling_report(request):
+    """Сводка выборочного профилирования по именам URL."""
+    if request.method == 'POST':
+        profiling.clear()
+        return redirect('profiling')
+    return render(request, 'core/profiling.html', {
+        'rows': profiling.report(),
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+        'buffer_size': settings.PROFILING_BUFFER_SIZE,
+    })
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# кэши, которые не видны другим процессам
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_snapshot_cache(app_configs, **kwargs):
+    """Снимки собирает воркер, а отдают веб-процессы: кэш нужен общий."""
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.SNAPSHOT_PAGES and backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'Снимки страниц (SNAPSHOT_PAGES) не работают с кэшем {backend}',
+            hint='Задайте CACHE_BACKEND=redis, file или db '
+                 'либо SNAPSHOT_PAGES=0',
+            id='posts.E001',
+        )]
+    return []
@@ -0,0 +1,82 @@
+"""Состояние лент для условных ответов, см. core.conditional.
+
+Каждая функция читает не больше одного запроса по индексу и
+возвращает (области кэша, дата последней записи или None[, версия]).
+"""
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from .models import Comment, FeedEntry, Group, Post, User
+
+
+def newest(queryset):
+    return queryset.order_by('-created').values_list(
+        'created', flat=True
+    ).first()
+
+
+def newest_subquery(queryset, **filters):
+    return Subquery(queryset.filter(**filters).order_by(
+        '-created'
+    ).values('created')[:1])
+
+
+def index_state(request):
+    return ['index', 'groups'], newest(Post.objects.all())
+
+
+def group_state(request, slug):
+    found = Group.objects.filter(slug=slug).annotate(
+        newest=newest_subquery(Post.objects, group=OuterRef('pk'))
+    ).values_list('pk', 'newest').first()
+    if found is None:
+        return ['groups'], None
+    group_id, newest_created = found
+    return ['groups', f'group:{group_id}'], newest_created
+
+
+def profile_state(request, username):
+    found = User.objects.filter(username=username).annotate(
+        newest=newest_subquery(Post.objects, author=OuterRef('pk'))
+    ).values_list('pk', 'newest').first()
+    if found is None:
+        return ['groups'], None
+    author_id, newest_created = found
+    return ['groups', f'author:{author_id}'], newest_created
+
+
+def post_state(request, post_id):
+    # на странице записи есть и число записей автора
+    found = Post.objects.filter(pk=post_id).annotate(
+        newest_comment=newest_subquery(Comment.objects, post=OuterRef('pk'))
+    ).values_list('author_id', 'created', 'newest_comment').first()
+    if found is None:
+        return ['groups', f'post:{post_id}'], None
+    author_id, created, newest_comment = found
+    return (
+        ['groups', f'post:{post_id}', f'author:{author_id}'],
+        max(filter(None, (created, newest_comment))),
+    )
+
+
+def comments_state(request, post_id):
+    return (
+        [f'post:{post_id}'],
+        newest(Comment.objects.filter(post_id=post_id)),
+    )
+
+
+def follow_state(request):
+    # ленту меняют задачи posts.feed в воркере: с локальным кэшем его
+    # поколение веб-процессу не видно, поэтому версия — сама лента.
+    # Записи после подписки добавляются и задним числом, и удаляются,
+    # поэтому нужна не только последняя дата. Запрос читает только
+    # индекс (user, created, id), а записей в ленте не больше
+    # FEED_MAX_LENGTH
+    feed = FeedEntry.objects.filter(user_id=request.user.pk).aggregate(
+        newest=Max('created'), last_id=Max('id'), entries=Count('id'),
+    )
+    return (
+        ['groups', f'feed:{request.user.pk}'],
+        feed['newest'],
+        (feed['last_id'], feed['entries']),
+    )
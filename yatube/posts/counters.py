@@ -0,0 +1,77 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def change_user_stats(user_id, field, delta):
+    changed = _change(UserStats.objects.filter(user_id=user_id), field, delta)
+    if not changed and delta > 0:
+        # строки статистики нет (пользователь создан в обход сигналов):
+        # заводим её сразу с точными значениями
+        UserStats.objects.get_or_create(user_id=user_id)
+        recount_users(User.objects.filter(pk=user_id))
+
+
+def user_stats(user):
+    """Статистика пользователя; если строки нет, заводит её с точными
+    значениями."""
+    stats = getattr(user, 'stats', None)
+    if stats is None:
+        recount_users(User.objects.filter(pk=user.pk))
+        stats = UserStats.objects.get(user_id=user.pk)
+        user.stats = stats
+    return stats
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+                field
+            ).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount_users(users):
+    """Пересчитывает статистику пользователей по данным Post и Follow."""
+    UserStats.objects.bulk_create(
+        [
+            UserStats(user_id=user_id)
+            for user_id in users.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+    UserStats.objects.filter(user__in=users).update(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+
+
+def recount_groups(groups):
+    groups.update(posts_count=_count(Post.objects.all(), 'group'))
+
+
+def recount_posts(posts):
+    posts.update(comments_count=_count(Comment.objects.all(), 'post'))
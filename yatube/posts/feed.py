@@ -0,0 +1,91 @@
+from django.conf import settings
+
+from core import generations
+from core.jobs import task
+
+from .models import FeedEntry, Follow, Post
+
+
+def _trim(user_id):
+    """Оставляет в ленте пользователя не больше FEED_MAX_LENGTH записей."""
+    stale = FeedEntry.objects.filter(
+        user_id=user_id
+    ).values_list('pk', flat=True)[settings.FEED_MAX_LENGTH:]
+    FeedEntry.objects.filter(pk__in=stale).delete()
+
+
+def _feed_scopes(user_ids):
+    return [f'feed:{user_id}' for user_id in user_ids]
+
+
+def _add_entries(user_id, posts):
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post_id=post_id, created=created)
+            for post_id, created in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+@task
+def fan_out_post(post_id):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    follower_ids = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, post=post, created=post.created)
+            for user_id in follower_ids
+        ],
+        ignore_conflicts=True,
+    )
+    for user_id in follower_ids:
+        _trim(user_id)
+    generations.bump(*_feed_scopes(follower_ids))
+
+
+@task
+def invalidate_followers(author_id):
+    """Сбрасывает кэш лент подписчиков после удаления поста автора."""
+    generations.bump(*_feed_scopes(Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)))
+
+
+@task
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    follows = Follow.objects.filter(user_id=user_id, author_id=author_id)
+    if not follows.exists():
+        # подписку отменили раньше, чем дошла очередь
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'created')[:settings.FEED_MAX_LENGTH]
+    _add_entries(user_id, posts)
+    _trim(user_id)
+    generations.bump(f'feed:{user_id}')
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id,
+    ).delete()
+    generations.bump(f'feed:{user_id}')
+
+
+def rebuild(user_id):
+    """Пересобирает ленту пользователя по данным Follow и Post."""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(
+        author__following__user_id=user_id
+    ).values_list('pk', 'created')[:settings.FEED_MAX_LENGTH]
+    _add_entries(user_id, posts)
+    generations.bump(f'feed:{user_id}')
@@ -0,0 +1,104 @@
+import datetime
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.template.loader import get_template
+from django.utils import timezone
+
+from core.middleware import get_zone
+from posts.models import Group, Post, User
+
+# карточка в прежнем виде: пояс вычислялся во view на каждый запрос
+# и включался блоком {% timezone %} внутри каждой карточки
+LEGACY_CARD = '''{% load tz %}
+<article>
+  <ul>
+    <li>
+      Автор: <a id="author-group-link" href="{% url 'posts:profile' post.author.username %}">{{ post.author.get_full_name }}</a>
+    </li>
+    {% if post.group %}
+      {% if not group %}
+        <li>
+          Группа: <a id="author-group-link" href="{% url 'posts:group_list' post.group.slug %}">{{ post.group.title }}</a>
+        </li>
+      {% endif %}
+    {% endif %}
+    <li>
+      {% timezone local_timezone %}
+        Дата публикации: {{ post.created|date:"d E Y H:i" }}
+      {% endtimezone %}
+    </li>
+  </ul>
+  {% include 'posts/includes/post_image.html' %}
+  <p>{{ post.text }}</p>
+  <a href="{% url 'posts:post_detail' post.id %}">Подробная информация</a><br>
+</article>
+'''  # noqa: E501
+
+
+def make_posts(count):
+    """Несохранённые посты без миниатюр: замеряется только шаблон."""
+    author = User(username='bench', first_name='Лев', last_name='Толстой')
+    group = Group(title='Бенчмарк', slug='bench')
+    posts = []
+    for number in range(1, count + 1):
+        post = Post(
+            pk=number, text='Текст поста ' * 20, author=author, group=group,
+            created=timezone.now(),
+        )
+        post._prefetched_objects_cache = {'thumbnails': []}
+        posts.append(post)
+    return posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время отрисовки карточек поста с поясом из view '
+        'и с поясом из TimezoneMiddleware'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=2000,
+            help='Сколько страниц по 10 карточек отрисовать',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--timezone', default='Europe/Moscow')
+
+    def handle(self, *args, **options):
+        posts = make_posts(10)
+        legacy = engines['django'].from_string(LEGACY_CARD)
+        card = get_template('posts/includes/post_card.html')
+
+        def render_legacy():
+            local_timezone = datetime.datetime.now(
+                datetime.timezone.utc
+            ).astimezone().tzinfo
+            for post in posts:
+                legacy.render({'post': post, 'local_timezone': local_timezone})
+
+        def render_current():
+            timezone.activate(get_zone(options['timezone']))
+            try:
+                for post in posts:
+                    card.render({'post': post})
+            finally:
+                timezone.deactivate()
+
+        for name, render in (
+            ('пояс во view', render_legacy),
+            ('middleware', render_current),
+        ):
+            samples = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                for _ in range(options['pages']):
+                    render()
+                samples.append(
+                    (time.perf_counter() - started) * 1000 / options['pages']
+                )
+            self.stdout.write(
+                f'{name:<14} {statistics.median(samples):.3f} мс на страницу'
+            )
@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import engines
+from django.template.loader import get_template
+
+# пагинатор в прежнем виде: ссылка на каждую страницу из page_range
+LEGACY_PAGINATOR = '''{% if page_obj.has_other_pages %}
+<nav aria-label="Page navigation" class="my-5">
+  <ul class="pagination">
+    {% for i in page_obj.paginator.page_range %}
+      {% if page_obj.number == i %}
+        <li class="page-item active">
+          <span class="page-link">{{ i }}</span>
+        </li>
+      {% else %}
+        <li class="page-item">
+          <a class="page-link" href="?{{ page_query }}page={{ i }}">{{ i }}</a>
+        </li>
+      {% endif %}
+    {% endfor %}
+  </ul>
+</nav>
+{% endif %}
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время отрисовки и размер пагинатора со ссылками на '
+        'все страницы и с окном вокруг текущей при росте числа страниц'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', default='10,100,1000,10000,100000',
+            help='Числа страниц через запятую',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        legacy = engines['django'].from_string(LEGACY_PAGINATOR)
+        current = get_template('posts/includes/paginator.html')
+        self.stdout.write(
+            f'{"страниц":>8} {"все, мс":>10} {"все, КБ":>9} '
+            f'{"окно, мс":>9} {"окно, КБ":>9}'
+        )
+        for pages in map(int, options['pages'].split(',')):
+            # число записей range известно без запросов к БД
+            paginator = Paginator(range(pages * 10), 10)
+            context = {
+                'page_obj': paginator.page(pages // 2 or 1),
+                'page_query': '',
+            }
+            row = [f'{pages:>8}']
+            for template in (legacy, current):
+                samples = []
+                for _ in range(options['repeat']):
+                    started = time.perf_counter()
+                    html = template.render(context)
+                    samples.append((time.perf_counter() - started) * 1000)
+                row.append(
+                    f'{statistics.median(samples):>9.2f} '
+                    f'{len(html.encode()) / 1024:>9.1f}'
+                )
+            self.stdout.write(' '.join(row))
@@ -0,0 +1,98 @@
+import json
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.utils.timezone import utc
+
+from core.management.utils import temporary_database
+
+START = datetime(2020, 1, 1, tzinfo=utc)
+
+
+def max_rss():
+    """Пиковая память процесса, МБ.
+
+    Страницы файла БД, отображённые через mmap_size из SQLITE_PRAGMAS,
+    тоже входят в RSS; память самого Python видна с SQLITE_TUNING=0.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет import_posts и export_posts на синтетическом файле '
+        'во временной БД: скорость и пиковую память'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'), default='ndjson',
+            help='Формат выгрузки',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        tmpdir = tempfile.mkdtemp(prefix='yatube-transfer-')
+        try:
+            source = os.path.join(tmpdir, 'posts.ndjson')
+            self.generate(source, options)
+            # DEBUG копил бы SQL всех запросов
+            with override_settings(DEBUG=False), temporary_database(
+                prefix='yatube-transfer-'
+            ):
+                self.measure('импорт', 'import_posts', source, options)
+                self.measure(
+                    f'экспорт в {options["format"]}', 'export_posts',
+                    os.path.join(tmpdir, f'export.{options["format"]}'),
+                    options,
+                )
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def generate(self, path, options):
+        rng = random.Random(options['seed'])
+        seconds = 3 * 365 * 24 * 3600
+        with open(path, 'w', encoding='utf-8') as file:
+            for number in range(1, options['rows'] + 1):
+                group = rng.randrange(options['groups'] + 1)
+                created = START + timedelta(seconds=rng.randrange(seconds))
+                file.write(json.dumps({
+                    'id': number,
+                    'author': f'author{rng.randrange(options["authors"])}',
+                    'group': f'group{group}' if group else '',
+                    'text': f'Пост номер {number} ' * rng.randint(1, 10),
+                    'image': '',
+                    'created': created.isoformat(),
+                }, ensure_ascii=False))
+                file.write('\n')
+        size = os.path.getsize(path) / 2 ** 20
+        self.stdout.write(
+            f'Файл: {options["rows"]} записей, {size:.0f} МБ; '
+            f'память процесса {max_rss():.0f} МБ'
+        )
+
+    def measure(self, title, command, path, options):
+        started = time.perf_counter()
+        call_command(
+            command, path, batch_size=options['batch_size'],
+            stdout=StringIO(),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{title}: {elapsed:.1f} с, {options["rows"] / elapsed:.0f} '
+            f'записей/с, пиковая память {max_rss():.0f} МБ'
+        )
@@ -0,0 +1,38 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты, комментарии или подписки в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdout')
+        parser.add_argument(
+            '--kind', choices=list(transfer.FIELDS), default='posts',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='По умолчанию — по расширению файла, иначе ndjson',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path, kind = options['path'], options['kind']
+        format = options['format'] or (
+            'csv' if os.path.splitext(path)[1] == '.csv' else 'ndjson'
+        )
+        rows = transfer.export_rows(kind, options['batch_size'])
+        if path == '-':
+            transfer.write_records(
+                rows, sys.stdout, transfer.FIELDS[kind], format
+            )
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            written = transfer.write_records(
+                rows, file, transfer.FIELDS[kind], format
+            )
+        self.stdout.write(f'Выгружено записей: {written}')
@@ -0,0 +1,51 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии или подписки из NDJSON или CSV '
+        'с сохранением дат создания'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для stdin')
+        parser.add_argument(
+            '--kind', choices=list(transfer.FIELDS), default='posts',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='По умолчанию — по расширению файла, иначе ndjson',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format = options['format'] or (
+            'csv' if os.path.splitext(path)[1] == '.csv' else 'ndjson'
+        )
+        importer = transfer.Importer(options['batch_size'])
+        if path == '-':
+            imported = self.load(importer, options['kind'], sys.stdin, format)
+        else:
+            with open(path, encoding='utf-8', newline='') as file:
+                imported = self.load(importer, options['kind'], file, format)
+        self.stdout.write(
+            f'Загружено записей: {imported}, новых пользователей: '
+            f'{importer.created_users}, новых групп: {importer.created_groups}'
+        )
+
+    def load(self, importer, kind, file, format):
+        records = transfer.read_records(file, format)
+        try:
+            return importer.run(kind, records)
+        except KeyError as error:
+            raise CommandError(f'В записи нет поля {error}')
+        except (ValueError, IntegrityError) as error:
+            # json.JSONDecodeError — тоже ValueError
+            raise CommandError(f'Импорт отменён: {error}')
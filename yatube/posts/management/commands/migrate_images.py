@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище по хэшу содержимого '
+        'и пачками переписывает имена в колонке image'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Удалять исходные файлы, на которые больше нет ссылок',
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        posts = Post.objects.exclude(image='').order_by('pk')
+        moved = missing = deleted = 0
+        last_pk = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk).values_list(
+                'pk', 'image'
+            )[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            changed = []
+            old_names = set()
+            for pk, name in batch:
+                if storage.is_content_name(name):
+                    continue
+                if not storage.exists(name):
+                    missing += 1
+                    continue
+                with storage.open(name) as file:
+                    changed.append(Post(pk=pk, image=storage.save(name, file)))
+                old_names.add(name)
+            # bulk_update не шлёт post_save: миниатюры перестраиваются ниже
+            Post.objects.bulk_update(changed, ['image'])
+            for post in changed:
+                # миниатюры строятся по имени исходника: у одинаковых
+                # картинок они теперь общие
+                thumbnails.generate.delay(post.pk)
+            moved += len(changed)
+            if options['delete']:
+                deleted += self.delete_unused(storage, old_names)
+        self.stdout.write(
+            f'Перенесено картинок: {moved}, нет файла: {missing}, '
+            f'удалено исходных файлов: {deleted}'
+        )
+
+    def delete_unused(self, storage, names):
+        used = set(Post.objects.filter(image__in=names).values_list(
+            'image', flat=True
+        ))
+        for name in names - used:
+            storage.delete(name)
+        return len(names - used)
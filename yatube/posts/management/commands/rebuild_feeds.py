@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок из данных Follow и Post'
+
+    def handle(self, *args, **options):
+        FeedEntry.objects.exclude(
+            user_id__in=Follow.objects.values('user_id')
+        ).delete()
+        user_ids = Follow.objects.order_by().values_list(
+            'user_id', flat=True
+        ).distinct()
+        rebuilt = 0
+        for user_id in user_ids.iterator():
+            feed.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(f'Пересобрано лент: {rebuilt}')
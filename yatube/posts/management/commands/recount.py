@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики записей, комментариев и подписок'
+
+    def handle(self, *args, **options):
+        counters.recount_users(User.objects.all())
+        counters.recount_groups(Group.objects.all())
+        counters.recount_posts(Post.objects.all())
+        self.stdout.write('Счётчики пересчитаны')
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import snapshots
+from posts.models import Group
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает снимки главной и групп для гостей, например после '
+        'выкладки новых шаблонов'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.SNAPSHOT_PAGES:
+            self.stdout.write('Снимки выключены: SNAPSHOT_PAGES = 0')
+            return
+        scopes = ['index'] + [
+            f'group:{group_id}'
+            for group_id in Group.objects.values_list('pk', flat=True)
+        ]
+        for scope in scopes:
+            snapshots.refresh(scope, force=True)
+        self.stdout.write(f'Пересобрано лент: {len(scopes)}')
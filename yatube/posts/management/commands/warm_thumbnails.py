@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db.models import Count, Q
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры картинок уже опубликованных постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить миниатюры и тех постов, где они уже есть',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if not options['all']:
+            sizes = list(settings.POST_THUMBNAIL_SIZES)
+            posts = posts.annotate(
+                ready=Count('thumbnails', filter=Q(thumbnails__size__in=sizes))
+            ).filter(ready__lt=len(sizes))
+        built = 0
+        for post_id in posts.values_list('pk', flat=True).iterator():
+            thumbnails.generate(post_id)
+            built += 1
+        self.stdout.write(f'Обработано постов: {built}')
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Thumbnail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(max_length=32, verbose_name='размер')),
+                ('url', models.CharField(max_length=255, verbose_name='адрес')),
+                ('width', models.PositiveIntegerField(verbose_name='ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='высота')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thumbnails', to='posts.Post', verbose_name='запись')),
+            ],
+            options={
+                'verbose_name': 'миниатюра',
+                'verbose_name_plural': 'миниатюры',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='thumbnail',
+            constraint=models.UniqueConstraint(fields=('post', 'size'), name='unique_post_thumbnail'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:43
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Добавьте изображение', storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='картинка'),
+        ),
+    ]
@@ -1,15 +1,23 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
-from core.models import CreatedModel
+from core.models import CountersModel, CreatedModel
+from core.storage import ContentAddressedStorage
 
 User = get_user_model()
 
 
-class Group(CreatedModel):
+class Group(CreatedModel, CountersModel):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число записей',
+    )
+
+    counter_fields = ('posts_count',)
 
     class Meta:
         verbose_name = 'группа'
@@ -19,13 +27,22 @@ class Group(CreatedModel):
         return self.title
 
 
-class Post(CreatedModel):
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Подгружает всё, что выводит карточка поста."""
+        return self.select_related('author', 'group').prefetch_related(
+            'thumbnails'
+        )
+
+
+class Post(CreatedModel, CountersModel):
     text = models.TextField(
         verbose_name='текст записи',
         help_text='Введите текст записи',
     )
     image = models.ImageField(
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         verbose_name='картинка',
         help_text='Добавьте изображение',
@@ -36,6 +53,7 @@ class Post(CreatedModel):
         blank=True,
         null=True,
         related_name='posts',
+        db_index=False,
         verbose_name='группа',
         help_text='Группа, к которой будет относиться запись',
     )
@@ -43,23 +61,102 @@ class Post(CreatedModel):
         User,
         on_delete=models.CASCADE,
         related_name='posts',
+        db_index=False,
         verbose_name='автор',
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число комментариев',
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    counter_fields = ('comments_count',)
 
     class Meta:
         ordering = ('-created',)
         verbose_name = 'запись'
         verbose_name_plural = 'записи'
+        # id в конце индекса: страницы выбираются по ключу (created, id),
+        # и обратный проход по индексу отдаёт их уже отсортированными
+        indexes = [
+            models.Index(fields=['created', 'id'], name='post_created_idx'),
+            models.Index(
+                fields=['author', 'created', 'id'],
+                name='post_author_created_idx'
+            ),
+            models.Index(
+                fields=['group', 'created', 'id'],
+                name='post_group_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return (self.text[:15])
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # группа на момент загрузки нужна, чтобы при смене группы
+        # поправить счётчики и кэш обеих групп
+        post.loaded_group_id = post.__dict__.get('group_id')
+        # по смене картинки заново строятся миниатюры
+        post.loaded_image = post.__dict__.get('image')
+        return post
+
+    @property
+    def thumbs(self):
+        """Готовые миниатюры по именам размеров из POST_THUMBNAIL_SIZES."""
+        return {thumb.size: thumb for thumb in self.thumbnails.all()}
+
+    def cache_scopes(self):
+        """Области кэша, содержимое которых зависит от поста."""
+        scopes = ['index', f'author:{self.author_id}', f'post:{self.pk}']
+        if self.group_id:
+            scopes.append(f'group:{self.group_id}')
+        return scopes
+
+
+class Thumbnail(models.Model):
+    """Миниатюра картинки поста, построенная при загрузке."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='thumbnails',
+        verbose_name='запись',
+    )
+    size = models.CharField(max_length=32, verbose_name='размер')
+    url = models.CharField(max_length=255, verbose_name='адрес')
+    width = models.PositiveIntegerField(verbose_name='ширина')
+    height = models.PositiveIntegerField(verbose_name='высота')
+
+    class Meta:
+        verbose_name = 'миниатюра'
+        verbose_name_plural = 'миниатюры'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'size'],
+                name='unique_post_thumbnail'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.size}'
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_list(self):
+        """Подгружает автора, которого выводит комментарий."""
+        return self.select_related('author')
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
         related_name='comments',
+        db_index=False,
         verbose_name='запись',
         help_text='Запись'
     )
@@ -75,10 +172,18 @@ class Comment(CreatedModel):
         help_text='Введите текст комментария',
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created',)
         verbose_name = 'комментарий'
         verbose_name_plural = 'коментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow(CreatedModel):
@@ -92,15 +197,112 @@ class Follow(CreatedModel):
         User,
         on_delete=models.CASCADE,
         related_name='following',
+        db_index=False,
         verbose_name='автор',
     )
 
     class Meta:
         verbose_name = 'подписка'
         verbose_name_plural = 'подписки'
+        indexes = [
+            # подписчики автора при раскладке постов по лентам
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'],
                 name='unique_followers'
             )
         ]
+
+
+class ImportedPost(models.Model):
+    """Id поста в файле импорта и в базе: по нему находят пост комментарии
+    из файла (posts.transfer)."""
+    source_id = models.BigIntegerField(unique=True, verbose_name='id в файле')
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='запись',
+    )
+
+    class Meta:
+        verbose_name = 'импортированная запись'
+        verbose_name_plural = 'импортированные записи'
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число записей',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число подписок',
+    )
+
+    class Meta:
+        verbose_name = 'статистика пользователя'
+        verbose_name_plural = 'статистика пользователей'
+
+
+class FeedEntryQuerySet(models.QuerySet):
+    def for_feed(self):
+        return self.select_related(
+            'post__author', 'post__group'
+        ).prefetch_related('post__thumbnails')
+
+
+class FeedEntry(models.Model):
+    """Запись в материализованной ленте подписок пользователя.
+
+    Дата публикации копируется из поста, чтобы страница ленты читалась
+    одним диапазоном индекса (user, created, id) без соединения с Follow.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='запись',
+    )
+    created = models.DateTimeField(verbose_name='дата публикации')
+
+    objects = FeedEntryQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-created', '-id')
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'ленты подписок'
+        indexes = [
+            models.Index(
+                fields=['user', 'created', 'id'],
+                name='feed_user_created_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry'
+            )
+        ]
@@ -0,0 +1,85 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import generations
+
+from . import counters, feed, snapshots, thumbnails
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    scopes = instance.cache_scopes()
+    loaded_group_id = getattr(instance, 'loaded_group_id', None)
+    if created:
+        counters.change_user_stats(instance.author_id, 'posts_count', 1)
+        counters.change_group_posts(instance.group_id, 1)
+        feed.fan_out_post.delay(instance.pk)
+    elif loaded_group_id != instance.group_id:
+        counters.change_group_posts(loaded_group_id, -1)
+        counters.change_group_posts(instance.group_id, 1)
+        if loaded_group_id:
+            scopes.append(f'group:{loaded_group_id}')
+    if not created:
+        # правка видна и в лентах подписчиков автора
+        feed.invalidate_followers.delay(instance.author_id)
+    instance.loaded_group_id = instance.group_id
+    if (instance.image.name or None) != (
+        getattr(instance, 'loaded_image', None) or None
+    ):
+        thumbnails.generate.delay(instance.pk)
+        instance.loaded_image = instance.image.name
+    generations.bump(*scopes)
+    snapshots.schedule(*scopes)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, 'posts_count', -1)
+    counters.change_group_posts(instance.group_id, -1)
+    feed.invalidate_followers.delay(instance.author_id)
+    generations.bump(*instance.cache_scopes())
+    snapshots.schedule(*instance.cache_scopes())
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+    generations.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+    generations.bump(f'post:{instance.post_id}')
+
+
+@receiver([post_save, post_delete], sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # название группы выводится в карточках всех лент
+    generations.bump('groups', f'group:{instance.pk}')
+    snapshots.schedule('index', f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user_stats(instance.author_id, 'followers_count', 1)
+        counters.change_user_stats(instance.user_id, 'following_count', 1)
+        feed.backfill.delay(instance.user_id, instance.author_id)
+        generations.bump(f'author:{instance.author_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user_stats(instance.author_id, 'followers_count', -1)
+    counters.change_user_stats(instance.user_id, 'following_count', -1)
+    feed.prune(instance.user_id, instance.author_id)
+    generations.bump(f'author:{instance.author_id}')
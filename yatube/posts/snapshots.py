@@ -0,0 +1,233 @@
+"""Готовые страницы главной и групп для гостей.
+
+Первые SNAPSHOT_PAGES страниц главной и каждой группы заранее
+рендерятся для гостя в каждом поясе SNAPSHOT_TIME_ZONES и лежат в кэше,
+а при заданном SNAPSHOT_ROOT ещё и файлами для фронтового прокси.
+Гостю (запрос без cookie сессии) view с @anonymous_snapshot отдаёт
+готовую страницу без запросов к БД и шаблонов; вошедшие пользователи
+и страницы дальше K-й получают обычный ответ. Гость из пояса не из
+списка получает снимок пояса с тем же смещением от UTC: время на
+странице зависит только от смещения (у старых постов оно могло
+отличаться до перехода на летнее время).
+
+После записи в ленту задача refresh() перерисовывает только её
+страницы и только если поколения ленты сменились с прошлой сборки.
+Снимки и задачи должны видеть общий кэш (redis, file или db), а не
+locmem отдельного процесса: это проверяет posts.checks. Записи в обход
+сигналов (bulk_create, update()) и смену шаблонов снимки не видят:
+после выкладки их пересобирает команда refresh_snapshots.
+
+Файлы для прокси: <SNAPSHOT_ROOT>/<пояс><путь>index.html, а страницы
+с параметрами — <SNAPSHOT_ROOT>/<пояс><путь><параметры>.html. Файлы
+есть только для поясов из списка, остальных гостей обслуживает
+приложение.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import Http404, HttpRequest, HttpResponse, QueryDict
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from core.generations import get_generations
+from core.jobs import task
+from core.middleware import get_zone
+
+from .models import Group
+
+# ссылка «Следующая» пагинатора по курсору
+NEXT_PAGE = re.compile(r'href="\?(after=[\w-]+)"')
+
+
+def _key(zone, full_path):
+    return f'snapshot:{zone}:{full_path}'
+
+
+def snapshot_zone(zone):
+    """Пояс из SNAPSHOT_TIME_ZONES с тем же смещением, что у zone, или None."""
+    now = timezone.now()
+    offset = now.astimezone(zone).utcoffset()
+    for name in settings.SNAPSHOT_TIME_ZONES:
+        if now.astimezone(get_zone(name)).utcoffset() == offset:
+            return name
+    return None
+
+
+def _meta_key(scope):
+    return f'snapshot:meta:{scope}'
+
+
+def _target(scope):
+    """Адрес первой страницы и области поколений ленты или None."""
+    if scope == 'index':
+        return reverse('posts:index'), ['index', 'groups']
+    group_id = int(scope.partition(':')[2])
+    slug = Group.objects.filter(pk=group_id).values_list(
+        'slug', flat=True
+    ).first()
+    if slug is None:
+        return None
+    return (
+        reverse('posts:group_list', args=[slug]),
+        ['groups', f'group:{group_id}'],
+    )
+
+
+def render_page(path, query=''):
+    """Ответ view на GET гостя без cookie, мимо middleware."""
+    match = resolve(path)
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.GET = QueryDict(query)
+    request.META['SERVER_NAME'] = 'localhost'
+    request.META['SERVER_PORT'] = '80'
+    request.user = AnonymousUser()
+    request.resolver_match = match
+    # сам view, без @anonymous_snapshot: иначе вернётся старый снимок
+    view = getattr(match.func, '__wrapped__', match.func)
+    return view(request, *match.args, **match.kwargs)
+
+
+def render_pages(path, zone):
+    """Первые SNAPSHOT_PAGES страниц ленты: {(пояс, адрес): html}."""
+    pages = {}
+    query = ''
+    with timezone.override(zone):
+        for number in range(settings.SNAPSHOT_PAGES):
+            try:
+                response = render_page(path, query)
+            except Http404:
+                break
+            if response.status_code != 200:
+                break
+            html = response.content
+            pages[zone, f'{path}?{query}' if query else path] = html
+            if number == 0:
+                pages[zone, f'{path}?page=1'] = html
+            found = NEXT_PAGE.search(html.decode())
+            if found is None:
+                break
+            query = found.group(1)
+    return pages
+
+
+def _file(zone, full_path):
+    path, _, query = full_path.partition('?')
+    name = f'{query}.html' if query else 'index.html'
+    return os.path.join(settings.SNAPSHOT_ROOT, zone, path.lstrip('/'), name)
+
+
+def _write_file(zone, full_path, html):
+    # прокси не должен увидеть недописанный файл
+    filename = _file(zone, full_path)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(filename))
+    with os.fdopen(handle, 'wb') as file:
+        file.write(html)
+    os.chmod(temporary, 0o644)
+    os.replace(temporary, filename)
+
+
+def store(pages):
+    cache.set_many(
+        {
+            _key(zone, full_path): {
+                'html': html,
+                'etag': quote_etag(hashlib.md5(html).hexdigest()),
+            }
+            for (zone, full_path), html in pages.items()
+        },
+        None,
+    )
+    if settings.SNAPSHOT_ROOT:
+        for (zone, full_path), html in pages.items():
+            _write_file(zone, full_path, html)
+
+
+def drop(pages):
+    cache.delete_many([_key(zone, full_path) for zone, full_path in pages])
+    if settings.SNAPSHOT_ROOT:
+        for zone, full_path in pages:
+            try:
+                os.remove(_file(zone, full_path))
+            except FileNotFoundError:
+                pass
+
+
+@task
+def refresh(scope, force=False):
+    """Пересобирает снимки ленты 'index' или 'group:<id>'.
+
+    Без force ничего не делает, если поколения ленты не менялись с
+    прошлой сборки. Снимки удалённой группы удаляются.
+    """
+    if not settings.SNAPSHOT_PAGES:
+        return
+    meta = cache.get(_meta_key(scope)) or {'generation': None, 'pages': []}
+    old_pages = {tuple(page) for page in meta['pages']}
+    target = _target(scope)
+    if target is None:
+        drop(old_pages)
+        cache.delete(_meta_key(scope))
+        return
+    path, scopes = target
+    # поколение читается до рендера: запись во время сборки оставит его
+    # старым, и следующая задача соберёт снимки заново
+    generation = get_generations(*scopes)
+    if not force and generation == meta['generation']:
+        return
+    pages = {}
+    for zone in settings.SNAPSHOT_TIME_ZONES:
+        pages.update(render_pages(path, zone))
+    store(pages)
+    drop(old_pages - set(pages))
+    cache.set(
+        _meta_key(scope),
+        {'generation': generation, 'pages': list(pages)},
+        None,
+    )
+
+
+def schedule(*scopes):
+    """Ставит в очередь пересборку снимков затронутых лент."""
+    if not settings.SNAPSHOT_PAGES:
+        return
+    for scope in scopes:
+        if scope == 'index' or scope.startswith('group:'):
+            refresh.delay(scope)
+
+
+def anonymous_snapshot(view):
+    """Декоратор view: гостю — готовая страница из кэша, если она есть."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            settings.SNAPSHOT_PAGES
+            and request.method in ('GET', 'HEAD')
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        ):
+            zone = snapshot_zone(timezone.get_current_timezone())
+            snapshot = zone and cache.get(_key(
+                zone, request.get_full_path()
+            ))
+            if snapshot is not None:
+                response = HttpResponse(snapshot['html'])
+                response['ETag'] = snapshot['etag']
+                response = get_conditional_response(
+                    request, etag=snapshot['etag'], response=response
+                )
+                patch_vary_headers(response, ['Cookie'])
+                return response
+        response = view(request, *args, **kwargs)
+        patch_vary_headers(response, ['Cookie'])
+        return response
+    return wrapper
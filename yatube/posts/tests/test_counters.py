@@ -0,0 +1,109 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from http import HTTPStatus
+
+from ..models import Post, Group, User, Comment, Follow, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test-slug',
+            description='test description'
+        )
+        cls.other_group = Group.objects.create(
+            title='other group',
+            slug='other-slug',
+            description='other description'
+        )
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        post = Post.objects.create(
+            text='test text',
+            author=CountersTests.user,
+            group=CountersTests.group,
+        )
+        self.assertEqual(self.stats(CountersTests.user).posts_count, 1)
+        self.assertEqual(
+            Group.objects.get(pk=CountersTests.group.pk).posts_count, 1
+        )
+        post.delete()
+        self.assertEqual(self.stats(CountersTests.user).posts_count, 0)
+        self.assertEqual(
+            Group.objects.get(pk=CountersTests.group.pk).posts_count, 0
+        )
+
+    def test_group_change_moves_post_count(self):
+        post = Post.objects.create(
+            text='test text',
+            author=CountersTests.user,
+            group=CountersTests.group,
+        )
+        post = Post.objects.get(pk=post.pk)
+        post.group = CountersTests.other_group
+        post.save()
+        group_counts = dict(Group.objects.values_list('slug', 'posts_count'))
+        self.assertEqual(group_counts, {'test-slug': 0, 'other-slug': 1})
+
+    def test_comment_counter_survives_stale_save(self):
+        post = Post.objects.create(text='test text', author=CountersTests.user)
+        Comment.objects.create(
+            text='test comment',
+            author=CountersTests.reader,
+            post=post,
+        )
+        post.text = 'edited text'
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 1)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(
+            user=CountersTests.reader,
+            author=CountersTests.user,
+        )
+        self.assertEqual(self.stats(CountersTests.user).followers_count, 1)
+        self.assertEqual(self.stats(CountersTests.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(CountersTests.user).followers_count, 0)
+        self.assertEqual(self.stats(CountersTests.reader).following_count, 0)
+
+    def test_recount_command_repairs_drift(self):
+        Post.objects.create(text='test text', author=CountersTests.user)
+        UserStats.objects.filter(user=CountersTests.user).update(
+            posts_count=10
+        )
+        UserStats.objects.filter(user=CountersTests.reader).delete()
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(self.stats(CountersTests.user).posts_count, 1)
+        self.assertEqual(self.stats(CountersTests.reader).posts_count, 0)
+
+    def test_profile_without_stats(self):
+        Post.objects.create(text='test text', author=CountersTests.user)
+        UserStats.objects.filter(user=CountersTests.user).delete()
+        response = self.client.get(reverse(
+            'posts:profile', args=[CountersTests.user.username]
+        ))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertContains(response, 'Всего постов: 1 ')
+        self.assertEqual(self.stats(CountersTests.user).posts_count, 1)
+
+    def test_post_detail_without_stats(self):
+        post = Post.objects.create(text='test text', author=CountersTests.user)
+        UserStats.objects.filter(user=CountersTests.user).delete()
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, 'Всего записей автора:  <span>1</span>')
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core import jobs
+
+from ..models import Post, User, Follow, FeedEntry
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.old_post = Post.objects.create(
+            text='old post',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FeedTests.reader)
+
+    def feed_posts(self):
+        return [entry.post for entry in FeedTests.reader.feed.all()]
+
+    def test_follow_backfills_feed(self):
+        self.authorized_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': FeedTests.author.username}
+        ))
+        self.assertEqual(self.feed_posts(), [FeedTests.old_post])
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=FeedTests.reader, author=FeedTests.author)
+        post = Post.objects.create(text='new post', author=FeedTests.author)
+        self.assertEqual(self.feed_posts(), [post, FeedTests.old_post])
+
+    def test_unfollow_prunes_feed(self):
+        Follow.objects.create(user=FeedTests.reader, author=FeedTests.author)
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': FeedTests.author.username}
+        ))
+        self.assertFalse(FeedTests.reader.feed.exists())
+
+    @override_settings(FEED_MAX_LENGTH=2)
+    def test_feed_length_is_capped(self):
+        Follow.objects.create(user=FeedTests.reader, author=FeedTests.author)
+        posts = [
+            Post.objects.create(text=f'post {i}', author=FeedTests.author)
+            for i in range(3)
+        ]
+        self.assertEqual(self.feed_posts(), posts[:0:-1])
+
+    def test_rebuild_feeds_command(self):
+        Follow.objects.create(user=FeedTests.reader, author=FeedTests.author)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(self.feed_posts(), [FeedTests.old_post])
+
+    @override_settings(JOBS_ALWAYS_EAGER=False)
+    def test_fan_out_runs_in_worker(self):
+        Follow.objects.create(user=FeedTests.reader, author=FeedTests.author)
+        jobs.work(burst=True)
+        post = Post.objects.create(text='new post', author=FeedTests.author)
+        self.assertNotIn(post, self.feed_posts())
+        jobs.work(burst=True)
+        self.assertIn(post, self.feed_posts())
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -12,6 +13,12 @@ from ..models import Post, Group, User, Comment
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
+def content_name(content, extension):
+    """Имя картинки в хранилище по хэшу содержимого."""
+    digest = hashlib.sha256(content).hexdigest()
+    return f'posts/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostCreateFormTests(TestCase):
     @classmethod
@@ -72,7 +79,7 @@ class PostCreateFormTests(TestCase):
             Post.objects.filter(
                 text='test text',
                 group=PostCreateFormTests.group,
-                image='posts/small.gif'
+                image=content_name(small_gif, '.gif')
             ).exists()
         )
 
@@ -115,7 +122,7 @@ class PostCreateFormTests(TestCase):
                 pk=edited_post.pk,
                 text='edited text',
                 group=PostCreateFormTests.group,
-                image='posts/small2.gif'
+                image=content_name(small_gif, '.gif')
             ).exists()
         )
 
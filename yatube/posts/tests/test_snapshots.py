@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.middleware import TIME_ZONE_COOKIE
+
+from .. import checks
+from ..models import Group, Post, User
+
+SNAPSHOT_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    SNAPSHOT_PAGES=2,
+    SNAPSHOT_ROOT=SNAPSHOT_ROOT,
+    SNAPSHOT_TIME_ZONES=['UTC', 'Europe/Moscow'],
+)
+class SnapshotTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(SNAPSHOT_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Author')
+        self.group = Group.objects.create(
+            title='Группа', slug='snapshot-group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            text='Первый пост', author=self.author, group=self.group
+        )
+        self.group_url = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug}
+        )
+
+    def test_guest_gets_snapshot_without_queries(self):
+        for url in (reverse('posts:index'), self.group_url):
+            with self.subTest(url=url), self.assertNumQueries(0):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'Первый пост')
+                self.assertIsNone(response.context)
+
+    def test_guest_zone_uses_snapshot_with_same_offset(self):
+        # у Москвы и Найроби смещение +3 без перехода на летнее время
+        self.client.cookies[TIME_ZONE_COOKIE] = 'Africa/Nairobi'
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Первый пост')
+        self.client.cookies[TIME_ZONE_COOKIE] = 'Asia/Kolkata'
+        response = self.client.get(reverse('posts:index'))
+        self.assertIsNotNone(response.context)
+
+    def test_process_local_cache_fails_check(self):
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            self.assertEqual(
+                [error.id for error in checks.check_snapshot_cache(None)],
+                ['posts.E001'],
+            )
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': SNAPSHOT_ROOT,
+        }}):
+            self.assertEqual(checks.check_snapshot_cache(None), [])
+
+    def test_new_post_refreshes_snapshots(self):
+        Post.objects.create(
+            text='Свежий пост', author=self.author, group=self.group
+        )
+        for url in (reverse('posts:index'), self.group_url):
+            with self.subTest(url=url), self.assertNumQueries(0):
+                self.assertContains(self.client.get(url), 'Свежий пост')
+
+    def test_authorized_user_gets_dynamic_page(self):
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'][0], self.post)
+
+    def test_first_pages_only(self):
+        Post.objects.bulk_create([
+            Post(text=f'Пост {number}', author=self.author)
+            for number in range(25)
+        ])
+        # bulk_create сигналов не шлёт: снимки пересоберёт следующая запись
+        Post.objects.create(text='Последний пост', author=self.author)
+        first = self.client.get(reverse('posts:index'))
+        second_cursor = first.content.decode().split(
+            'href="?after='
+        )[1].split('"')[0]
+        with self.assertNumQueries(0):
+            second = self.client.get(f'/?after={second_cursor}')
+        self.assertEqual(second.status_code, 200)
+        third_cursor = second.content.decode().split(
+            'href="?after='
+        )[1].split('"')[0]
+        third = self.client.get(f'/?after={third_cursor}')
+        self.assertIsNotNone(third.context)
+
+    def test_conditional_get(self):
+        etag = self.client.get(reverse('posts:index'))['ETag']
+        response = self.client.get(
+            reverse('posts:index'), HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_files_for_proxy(self):
+        filename = os.path.join(
+            SNAPSHOT_ROOT, 'UTC', 'group', self.group.slug, 'index.html'
+        )
+        with open(filename, 'rb') as file:
+            self.assertIn('Первый пост'.encode(), file.read())
+        self.group.delete()
+        self.assertFalse(os.path.exists(filename))
+        self.assertEqual(self.client.get(self.group_url).status_code, 404)
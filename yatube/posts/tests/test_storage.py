@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.functional import empty
+from sorl.thumbnail import default
+
+from ..models import Post, User
+from .test_thumbnails import SMALL_GIF
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # хранилище sorl запоминает MEDIA_ROOT при первом обращении
+        default.storage._wrapped = empty
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        default.storage._wrapped = empty
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, name):
+        return Post.objects.create(
+            text='test text',
+            author=ContentStorageTests.user,
+            image=SimpleUploadedFile(
+                name=name, content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+
+    def test_identical_uploads_share_file_and_thumbnails(self):
+        first = self.create_post('small.gif')
+        second = self.create_post('copy.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name,
+            r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$',
+        )
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertEqual(
+            first.thumbnails.get().url, second.thumbnails.get().url
+        )
+
+    def test_migrate_images(self):
+        # картинки, загруженные в плоский каталог posts/
+        old_names = [
+            default_storage.save(f'posts/{name}', ContentFile(SMALL_GIF))
+            for name in ('old.gif', 'old_copy.gif')
+        ]
+        Post.objects.bulk_create([
+            Post(text=name, author=ContentStorageTests.user, image=name)
+            for name in old_names + ['posts/missing.gif']
+        ])
+        out = StringIO()
+        call_command(
+            'migrate_images', '--batch-size=2', '--delete', stdout=out
+        )
+        self.assertIn(
+            'Перенесено картинок: 2, нет файла: 1, '
+            'удалено исходных файлов: 2',
+            out.getvalue(),
+        )
+        first, second, missing = Post.objects.order_by('pk')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.storage.exists(first.image.name))
+        self.assertTrue(first.thumbnails.exists())
+        self.assertEqual(missing.image.name, 'posts/missing.gif')
+        for name in old_names:
+            self.assertFalse(default_storage.exists(name))
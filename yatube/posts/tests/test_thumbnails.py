@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.functional import empty
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post, Thumbnail, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # хранилище sorl запоминает MEDIA_ROOT при первом обращении
+        default.storage._wrapped = empty
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        default.storage._wrapped = empty
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self):
+        return Post.objects.create(
+            text='test text',
+            author=ThumbnailsTests.user,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif'
+            ),
+        )
+
+    def test_generate_builds_configured_sizes(self):
+        post = self.create_post()
+        thumbnails.generate(post.pk)
+        thumb = Post.objects.for_feed().get(pk=post.pk).thumbs['card']
+        self.assertEqual((thumb.width, thumb.height), (960, 339))
+        self.assertTrue(thumb.url.startswith(settings.MEDIA_URL))
+
+    def test_generate_skips_missing_image(self):
+        post = Post.objects.create(
+            text='test text',
+            author=ThumbnailsTests.user,
+            image='posts/missing.gif',
+        )
+        thumbnails.generate(post.pk)
+        self.assertFalse(post.thumbnails.exists())
+
+    def test_pages_show_stored_thumbnail(self):
+        post = self.create_post()
+        thumbnails.generate(post.pk)
+        url = post.thumbnails.get().url
+        cache.clear()
+        for page in (
+            reverse('posts:index'),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        ):
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), url)
+
+    def test_saving_image_builds_thumbnails(self):
+        post = self.create_post()
+        self.assertTrue(post.thumbnails.filter(size='card').exists())
+
+    def test_warm_thumbnails(self):
+        post = self.create_post()
+        # пост, загруженный до появления миниатюр
+        post.thumbnails.all().delete()
+        Post.objects.create(text='no image', author=ThumbnailsTests.user)
+        out = StringIO()
+        call_command('warm_thumbnails', stdout=out)
+        self.assertIn('Обработано постов: 1', out.getvalue())
+        self.assertEqual(
+            list(post.thumbnails.values_list('size', flat=True)),
+            list(settings.POST_THUMBNAIL_SIZES),
+        )
+        call_command('warm_thumbnails', stdout=out)
+        self.assertIn('Обработано постов: 0', out.getvalue())
+        self.assertEqual(Thumbnail.objects.count(), 1)
@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils.timezone import utc
+
+from search import index
+
+from ..models import Comment, FeedEntry, Follow, Group, Post, User
+
+CREATED = datetime(2020, 5, 17, 10, 30, tzinfo=utc)
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir, ignore_errors=True)
+        super().tearDownClass()
+
+    def write(self, name, lines):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines))
+        return path
+
+    def import_file(self, path, kind='posts'):
+        call_command(
+            'import_posts', path, kind=kind, batch_size=2, stdout=StringIO()
+        )
+
+    def test_import_posts_comments_and_follows(self):
+        reader = User.objects.create_user(username='reader')
+        Group.objects.create(title='Группа', slug='group', description='')
+        posts = self.write('posts.ndjson', [json.dumps({
+            'id': 100 + number, 'author': 'author', 'group': 'group',
+            'text': f'импорт {number}', 'image': '',
+            'created': CREATED.isoformat(),
+        }) for number in range(3)])
+        comments = self.write('comments.csv', [
+            'post,author,text,created',
+            f'100,reader,первый,{CREATED.isoformat()}',
+            '100,reader,второй,',
+        ])
+        follows = self.write('follows.ndjson', [json.dumps({
+            'user': 'reader', 'author': 'author',
+            'created': CREATED.isoformat(),
+        })])
+        self.import_file(posts)
+        self.import_file(comments, 'comments')
+        self.import_file(follows, 'follows')
+
+        author = User.objects.get(username='author')
+        post = Post.objects.get(text='импорт 0')
+        self.assertEqual(post.author, author)
+        self.assertEqual(post.created, CREATED)
+        self.assertEqual(post.group.posts_count, 3)
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(
+            Comment.objects.get(text='первый').created, CREATED
+        )
+        self.assertEqual(author.stats.posts_count, 3)
+        self.assertEqual(author.stats.followers_count, 1)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=reader).count(), 3
+        )
+        self.assertEqual(
+            Follow.objects.get(user=reader, author=author).created, CREATED
+        )
+        [(_, found)] = index.get_index().search('второй', 10)
+        self.assertEqual(found, post.pk)
+
+    def test_export_and_import_round_trip(self):
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='текст, с "кавычками"')
+        Post.objects.filter(pk=post.pk).update(created=CREATED)
+        for format in ('csv', 'ndjson'):
+            with self.subTest(format=format):
+                path = os.path.join(self.tmpdir, f'export.{format}')
+                call_command('export_posts', path, stdout=StringIO())
+                Post.objects.all().delete()
+                self.import_file(path)
+                post = Post.objects.get()
+                self.assertEqual(post.text, 'текст, с "кавычками"')
+                self.assertEqual(post.created, CREATED)
+                self.assertEqual(post.author, author)
+
+    def test_broken_file_rolls_back(self):
+        path = self.write('broken.ndjson', [
+            json.dumps({'id': 1, 'author': 'author', 'text': 'раз'}),
+            json.dumps({'id': 2, 'author': 'author', 'text': 'два'}),
+            json.dumps({'id': 3, 'text': 'без автора'}),
+        ])
+        with self.assertRaises(CommandError):
+            self.import_file(path)
+        self.assertFalse(Post.objects.exists())
+
+    def test_posts_into_non_empty_base_get_new_ids(self):
+        author = User.objects.create_user(username='author')
+        existing = Post.objects.create(author=author, text='уже есть')
+        posts = self.write('posts.ndjson', [
+            json.dumps({
+                'id': existing.pk, 'author': 'author', 'text': 'раз',
+                'created': CREATED.isoformat(),
+            }),
+        ])
+        comments = self.write('comments.ndjson', [
+            json.dumps({
+                'post': existing.pk, 'author': 'author', 'text': 'к посту',
+            }),
+        ])
+        self.import_file(posts)
+        self.import_file(comments, 'comments')
+        imported = Post.objects.get(text='раз')
+        self.assertNotEqual(imported.pk, existing.pk)
+        self.assertEqual(imported.created, CREATED)
+        self.assertEqual(Comment.objects.get().post, imported)
+        self.assertEqual(Post.objects.get(pk=existing.pk).text, 'уже есть')
+
+    def test_repeated_follows_are_counted_once(self):
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=reader, author=author)
+        path = self.write('follows.ndjson', [
+            json.dumps({'user': 'reader', 'author': 'author'}),
+            json.dumps({'user': 'author', 'author': 'reader'}),
+            json.dumps({'user': 'author', 'author': 'reader'}),
+        ])
+        self.import_file(path, 'follows')
+        self.assertEqual(Follow.objects.count(), 2)
+        author.stats.refresh_from_db()
+        reader.stats.refresh_from_db()
+        self.assertEqual(author.stats.following_count, 1)
+        self.assertEqual(reader.stats.followers_count, 1)
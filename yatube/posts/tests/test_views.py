@@ -1,9 +1,20 @@
-from django.test import TestCase, Client
+import gzip
+import json
+from datetime import timedelta
+from unittest import skipIf
+
+from django.conf import settings
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django import forms
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Post, Group, User, Comment, FeedEntry, Follow
 
-from ..models import Post, Group, User, Comment, Follow
+# кэш в таблице БД добавляет свои запросы к подсчитываемым
+CACHE_IN_DB = settings.CACHES['default']['BACKEND'].endswith('DatabaseCache')
 
 
 class ViewsTests(TestCase):
@@ -156,11 +167,56 @@ class ViewsTests(TestCase):
         cache.clear()
         response = self.guest_client.get(reverse('posts:index'))
         content = response.content
-        self.post.delete()
+        # правка в обход сигналов не меняет поколение: отдаётся кэш
+        Post.objects.filter(pk=self.post.pk).update(text='changed text')
         response = self.guest_client.get(reverse('posts:index'))
         content2 = response.content
         self.assertEqual(content, content2)
 
+    def test_cache_invalidated_by_writes(self):
+        pages = [
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': self.post.group.slug}
+            ),
+            reverse(
+                'posts:profile',
+                kwargs={'username': self.user.username}
+            ),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        cache.clear()
+        for page in pages:
+            self.guest_client.get(page)
+        self.post.text = 'edited text'
+        self.post.save()
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.guest_client.get(page)
+                self.assertContains(response, 'edited text')
+
+    def test_cache_varies_by_page(self):
+        cache.clear()
+        for i in range(10):
+            Post.objects.create(text=f'filler {i}', author=self.user2)
+        response = self.guest_client.get(reverse('posts:index'))
+        response_2 = self.guest_client.get(
+            reverse('posts:index') + '?page=2'
+        )
+        self.assertNotEqual(response.content, response_2.content)
+
+    def test_comment_invalidates_post_detail(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        cache.clear()
+        self.guest_client.get(url)
+        Comment.objects.create(
+            text='fresh comment',
+            author=self.user2,
+            post=self.post,
+        )
+        self.assertContains(self.guest_client.get(url), 'fresh comment')
+
     def test_auth_user_can_follow(self):
         self.authorized_client.get(reverse(
             'posts:profile_follow',
@@ -286,3 +342,362 @@ class PaginatorViewsTest(TestCase):
         for response in responses_second_page:
             with self.subTest():
                 self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_cursor_navigation(self):
+        cache.clear()
+        response = PaginatorViewsTest.guest_client.get(reverse('posts:index'))
+        next_cursor = response.context['page_obj'].next_cursor
+        response_2 = PaginatorViewsTest.guest_client.get(
+            reverse('posts:index') + f'?after={next_cursor}'
+        )
+        page_2 = response_2.context['page_obj']
+        self.assertEqual([post.id for post in page_2], [3, 2, 1])
+        self.assertEqual(page_2.number, 2)
+        self.assertFalse(page_2.has_next())
+        response_1 = PaginatorViewsTest.guest_client.get(
+            reverse('posts:index') + f'?before={page_2.previous_cursor}'
+        )
+        self.assertEqual(
+            [post.id for post in response_1.context['page_obj']],
+            list(range(13, 3, -1))
+        )
+
+    def test_last_page_is_read_from_tail(self):
+        cache.clear()
+        response = PaginatorViewsTest.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'href="?page=last"')
+        with CaptureQueriesContext(connection) as queries:
+            response = PaginatorViewsTest.guest_client.get(
+                reverse('posts:index') + '?page=last'
+            )
+        page = response.context['page_obj']
+        self.assertEqual([post.id for post in page], [3, 2, 1])
+        self.assertEqual(page.number, 2)
+        self.assertFalse(page.has_next())
+        self.assertFalse(any(
+            'OFFSET' in query['sql'] for query in queries.captured_queries
+        ))
+        # индекс страниц после хвоста совпадает с нумерацией ?page=N
+        response = PaginatorViewsTest.guest_client.get(
+            reverse('posts:index') + '?page=2'
+        )
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']], [3, 2, 1]
+        )
+        response = PaginatorViewsTest.guest_client.get(
+            reverse('posts:index') + f'?before={page.previous_cursor}'
+        )
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            list(range(13, 3, -1)),
+        )
+
+    @skipIf(CACHE_IN_DB, 'кэш хранится в БД')
+    def test_paginator_runs_no_full_count_query(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            PaginatorViewsTest.guest_client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as group_queries:
+            response = PaginatorViewsTest.guest_client.get(reverse(
+                'posts:group_list',
+                kwargs={'slug': 'test-slug'}
+            ) + '?page=2')
+        # на главной число записей считается до COUNT_EXACT_LIMIT,
+        # у группы берётся из её счётчика
+        for query in queries:
+            if 'COUNT(' in query['sql']:
+                with self.subTest(sql=query['sql']):
+                    self.assertIn('LIMIT', query['sql'])
+        for query in group_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'])
+        paginator = response.context['page_obj'].paginator
+        self.assertEqual(paginator.count, 13)
+        self.assertEqual(paginator.total_pages, 2)
+
+    def test_page_number_uses_cached_cursor_index(self):
+        cache.clear()
+        url = reverse('posts:profile', kwargs={'username': 'TestUser'})
+        PaginatorViewsTest.guest_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = PaginatorViewsTest.guest_client.get(url + '?page=2')
+        self.assertEqual(len(response.context['page_obj']), 3)
+        for query in queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('OFFSET', query['sql'])
+
+
+@skipIf(CACHE_IN_DB, 'кэш хранится в БД')
+class QueryCountTests(TestCase):
+    """Число запросов страницы не зависит от числа постов на ней."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.follower = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test-slug',
+            description='test description'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.follower_client = Client()
+        self.follower_client.force_login(QueryCountTests.follower)
+
+    def create_posts(self, count):
+        for i in range(count):
+            Post.objects.create(
+                text=f'test text {i}',
+                group=QueryCountTests.group,
+                author=QueryCountTests.user,
+            )
+
+    def assert_pages_queries(self):
+        # миниатюры всех постов страницы подгружаются одним запросом,
+        # ещё один запрос читает состояние ленты для ETag
+        pages_queries = {
+            reverse('posts:index'): 3,
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': 'test-slug'}
+            ): 4,
+            reverse(
+                'posts:profile',
+                kwargs={'username': 'TestUser'}
+            ): 5,
+        }
+        for page, queries in pages_queries.items():
+            with self.subTest(page=page):
+                cache.clear()
+                with self.assertNumQueries(queries):
+                    self.guest_client.get(page)
+        with self.subTest(page='posts:followed'):
+            with self.assertNumQueries(5):
+                self.follower_client.get(reverse('posts:followed'))
+
+    def test_one_post_page_queries(self):
+        self.create_posts(1)
+        self.assert_pages_queries()
+
+    def test_full_page_queries(self):
+        self.create_posts(10)
+        self.assert_pages_queries()
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(text='test text', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def create_comments(self, count, prefix='Commenter'):
+        return [
+            Comment.objects.create(
+                text=f'comment {i}',
+                author=User.objects.create_user(username=f'{prefix}{i}'),
+                post=CommentPaginationTests.post,
+            )
+            for i in range(count)
+        ]
+
+    def get_detail(self):
+        return self.guest_client.get(reverse(
+            'posts:post_detail',
+            kwargs={'post_id': CommentPaginationTests.post.pk},
+        ))
+
+    def test_first_page_and_lazy_loading(self):
+        comments = self.create_comments(7)[::-1]
+        page = self.get_detail().context['comments']
+        self.assertEqual(list(page), comments[:5])
+        response = self.guest_client.get(
+            reverse(
+                'posts:comments',
+                kwargs={'post_id': CommentPaginationTests.post.pk},
+            ),
+            {'after': page.next_cursor},
+        )
+        self.assertEqual(list(response.context['comments']), comments[5:])
+        self.assertContains(response, 'comment 0')
+        self.assertNotContains(response, 'data-more-comments')
+
+    def test_detail_pages_have_own_comment_fragments(self):
+        self.create_comments(7)
+        page = self.get_detail().context['comments']
+        response = self.guest_client.get(
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': CommentPaginationTests.post.pk},
+            ),
+            {'after': page.next_cursor},
+        )
+        self.assertContains(response, 'comment 0')
+        self.assertNotContains(response, 'comment 6')
+
+    def test_comment_queries_do_not_depend_on_count(self):
+        # состояние для ETag, запись, её миниатюры
+        # и страница комментариев с авторами
+        self.create_comments(1)
+        with self.assertNumQueries(4):
+            self.get_detail()
+        self.create_comments(30, prefix='Other')
+        cache.clear()
+        with self.assertNumQueries(4):
+            self.get_detail()
+
+
+@skipIf(CACHE_IN_DB, 'кэш хранится в БД')
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.follower = User.objects.create_user(username='Follower')
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test-slug',
+            description='test description'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        cls.post = Post.objects.create(
+            text='test text', author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.follower_client = Client()
+        self.follower_client.force_login(ConditionalGetTests.follower)
+
+    def pages(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'TestUser'}),
+            reverse(
+                'posts:post_detail',
+                kwargs={'post_id': ConditionalGetTests.post.pk}
+            ),
+        ]
+
+    def test_unchanged_pages_answer_not_modified(self):
+        for page in self.pages():
+            with self.subTest(page=page):
+                etag = self.guest_client.get(page)['ETag']
+                # только чтение состояния ленты, без шаблонов
+                with self.assertNumQueries(1):
+                    response = self.guest_client.get(
+                        page, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_unchanged_feed_answers_not_modified(self):
+        page = reverse('posts:followed')
+        etag = self.follower_client.get(page)['ETag']
+        # сессия, пользователь и сводка ленты по индексу
+        with self.assertNumQueries(3):
+            response = self.follower_client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_feed_change_without_generation_is_seen(self):
+        # воркер с локальным кэшем меняет поколение только у себя
+        page = reverse('posts:followed')
+        etag = self.follower_client.get(page)['ETag']
+        post = Post.objects.create(text='older post', author=self.follower)
+        FeedEntry.objects.bulk_create([FeedEntry(
+            user=ConditionalGetTests.follower,
+            post=post,
+            created=ConditionalGetTests.post.created - timedelta(days=1),
+        )])
+        response = self.follower_client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'older post')
+
+    def test_edit_changes_pages_and_feed(self):
+        pages = self.pages()
+        etags = [self.guest_client.get(page)['ETag'] for page in pages]
+        feed_etag = self.follower_client.get(
+            reverse('posts:followed')
+        )['ETag']
+        post = Post.objects.get(pk=ConditionalGetTests.post.pk)
+        post.text = 'edited text'
+        post.save()
+        for page, etag in zip(pages, etags):
+            with self.subTest(page=page):
+                response = self.guest_client.get(
+                    page, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertContains(response, 'edited text')
+        response = self.follower_client.get(
+            reverse('posts:followed'), HTTP_IF_NONE_MATCH=feed_etag
+        )
+        self.assertContains(response, 'edited text')
+
+    def test_etag_depends_on_user(self):
+        page = reverse('posts:index')
+        etag = self.guest_client.get(page)['ETag']
+        response = self.follower_client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ProfileExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        for number in range(3):
+            Post.objects.create(author=cls.author, text=f'пост {number}')
+        Post.objects.create(author=cls.other, text='чужой пост')
+        cls.url = reverse(
+            'posts:profile_export', kwargs={'username': 'author'}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(ProfileExportTests.author)
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_streams_own_posts(self):
+        response = self.client.get(self.url)
+        lines = self.content(response).decode().splitlines()
+        self.assertEqual(lines[0], 'id,author,group,text,image,created')
+        self.assertEqual(len(lines), 4)
+        self.assertIn('author,,пост 0', lines[1])
+        self.assertIn('attachment', response['Content-Disposition'])
+
+    def test_ndjson_export_is_gzipped_on_request(self):
+        response = self.client.get(
+            self.url, {'format': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        records = [
+            json.loads(line) for line in
+            gzip.decompress(self.content(response)).splitlines()
+        ]
+        self.assertEqual(
+            [record['text'] for record in records],
+            ['пост 0', 'пост 1', 'пост 2'],
+        )
+
+    def test_only_owner_can_export(self):
+        self.client.force_login(ProfileExportTests.other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_is_rate_limited(self):
+        self.content(self.client.get(self.url))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(int(response['Retry-After']), 60)
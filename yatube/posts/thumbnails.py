@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from sorl.thumbnail import get_thumbnail
+
+from core import generations
+from core.jobs import task
+
+from . import feed, snapshots
+from .models import Post, Thumbnail
+
+
+def _source_exists(image):
+    try:
+        return bool(image) and image.storage.exists(image.name)
+    except SuspiciousFileOperation:
+        return False
+
+
+@task
+def generate(post_id):
+    """Строит все размеры из POST_THUMBNAIL_SIZES и сохраняет их адреса."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None:
+        return
+    thumbs = []
+    if _source_exists(post.image):
+        for size, (geometry, options) in settings.POST_THUMBNAIL_SIZES.items():
+            image = get_thumbnail(post.image, geometry, **options)
+            if image.size is None:
+                # sorl не смог прочитать исходный файл
+                continue
+            thumbs.append(Thumbnail(
+                post=post,
+                size=size,
+                url=image.url,
+                width=image.width,
+                height=image.height,
+            ))
+    with transaction.atomic():
+        Thumbnail.objects.filter(post=post).delete()
+        Thumbnail.objects.bulk_create(thumbs)
+    generations.bump(*post.cache_scopes())
+    snapshots.schedule(*post.cache_scopes())
+    feed.invalidate_followers(post.author_id)
@@ -0,0 +1,366 @@
+"""Массовый перенос постов, комментариев и подписок в NDJSON и CSV.
+
+Записи читаются и пишутся потоком, пачками по batch_size, поэтому память
+не зависит от размера файла. Авторы и группы указываются по username и
+slug и при импорте ищутся в словарях, загруженных одним запросом;
+недостающие создаются. Посты получают новые id, а соответствие id из
+файла сохраняется в ImportedPost: по нему комментарии из файла находят
+свои посты, поэтому импорт возможен и в базу с данными. Даты created
+ставятся после вставки одним UPDATE на пачку. bulk_create не вызывает
+сигналы, поэтому счётчики,
+поисковый индекс, ленты и поколения кэша импорт обновляет сам;
+миниатюры картинок потом строит manage.py warm_thumbnails.
+"""
+import csv
+import itertools
+import json
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Q, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core import generations
+from search import index
+
+from . import counters, feed, snapshots
+from .models import (
+    Comment, Follow, Group, ImportedPost, Post, User, UserStats,
+)
+
+FORMATS = ('ndjson', 'csv')
+
+FIELDS = {
+    'posts': ('id', 'author', 'group', 'text', 'image', 'created'),
+    'comments': ('id', 'post', 'author', 'text', 'created'),
+    'follows': ('user', 'author', 'created'),
+}
+
+# строк в одном UPDATE дат: у старых SQLite не больше 999 параметров
+CREATED_CHUNK = 200
+
+# поля values_list для выгрузки, в порядке FIELDS
+EXPORT_QUERIES = {
+    'posts': (Post, (
+        'pk', 'author__username', 'group__slug', 'text', 'image', 'created'
+    )),
+    'comments': (Comment, (
+        'pk', 'post_id', 'author__username', 'text', 'created'
+    )),
+    'follows': (Follow, ('user__username', 'author__username', 'created')),
+}
+
+
+def export_rows(kind, batch_size=1000, queryset=None):
+    """Строки выгрузки кортежами в порядке FIELDS[kind], без моделей."""
+    model, fields = EXPORT_QUERIES[kind]
+    if queryset is None:
+        queryset = model.objects.all()
+    rows = queryset.order_by('pk').values_list(*fields)
+    for row in rows.iterator(chunk_size=batch_size):
+        yield tuple(
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in row
+        )
+
+
+class _Echo:
+    """Файл для csv.writer, который возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def iter_records(rows, fields, format):
+    """Строки файла выгрузки; у CSV первая — заголовок."""
+    if format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(
+                ['' if value is None else value for value in row]
+            )
+        return
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n'
+
+
+def chunked(lines, size=2 ** 16):
+    """Склеивает строки в куски примерно по size символов."""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def write_records(rows, file, fields, format):
+    """Пишет строки в файл; возвращает их число."""
+    lines = iter_records(rows, fields, format)
+    if format == 'csv':
+        file.write(next(lines))
+    written = 0
+    for line in lines:
+        file.write(line)
+        written += 1
+    return written
+
+
+def read_records(file, format):
+    """Словари записей из файла по одной."""
+    if format == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _created(value):
+    if not value:
+        return timezone.now()
+    created = parse_datetime(value)
+    if created is None:
+        raise ValueError(f'Неверная дата: {value}')
+    if timezone.is_naive(created):
+        created = timezone.make_aware(created, timezone.utc)
+    return created
+
+
+def _set_created(model, rows):
+    """Ставит даты из файла: при вставке auto_now_add заменил их текущим
+    временем. rows — [(условия поиска строки, дата), ...]."""
+    for start in range(0, len(rows), CREATED_CHUNK):
+        chunk = rows[start:start + CREATED_CHUNK]
+        model.objects.filter(
+            reduce(or_, (Q(**lookup) for lookup, _ in chunk))
+        ).update(created=Case(
+            *(
+                When(**lookup, then=Value(created))
+                for lookup, created in chunk
+            ),
+            output_field=DateTimeField(),
+        ))
+
+
+def _insert(model, objects):
+    """bulk_create с датами created из объектов; заполняет их pk."""
+    created = [obj.created for obj in objects]
+    last = model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+    model.objects.bulk_create(objects)
+    if objects and objects[0].pk is None:
+        # SQLite не возвращает pk из bulk_create: новые строки идут подряд
+        # после прежнего максимума
+        pks = list(model.objects.filter(pk__gt=last).order_by(
+            'pk'
+        ).values_list('pk', flat=True)[:len(objects) + 1])
+        if len(pks) != len(objects):
+            raise ValueError('в таблицу одновременно с импортом писали')
+        for obj, pk in zip(objects, pks):
+            obj.pk = pk
+    _set_created(model, [
+        ({'pk': obj.pk}, value) for obj, value in zip(objects, created)
+    ])
+
+
+class Importer:
+    """Загружает записи пачками через bulk_create."""
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        # изменения счётчиков копятся за весь импорт и применяются в конце
+        # одним UPDATE на пользователя или группу, а не на каждую пачку;
+        # их число ограничено числом пользователей и групп
+        self.user_counts = Counter()
+        self.group_counts = Counter()
+        self.readers = set()
+        self.created_users = 0
+        self.created_groups = 0
+
+    def run(self, kind, records):
+        """Импортирует записи одной транзакцией; возвращает их число."""
+        load = getattr(self, f'load_{kind}')
+        imported = 0
+        with transaction.atomic():
+            while True:
+                batch = list(itertools.islice(records, self.batch_size))
+                if not batch:
+                    break
+                load(batch)
+                imported += len(batch)
+            self.apply_counts()
+            self.rebuild_feeds()
+        return imported
+
+    def user_ids(self, usernames):
+        missing = set(usernames) - set(self.users)
+        if missing:
+            password = make_password(None)
+            User.objects.bulk_create([
+                User(username=username, password=password)
+                for username in missing
+            ])
+            created = dict(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk'))
+            # bulk_create не вызывает сигнал, который заводит статистику
+            UserStats.objects.bulk_create(
+                [UserStats(user_id=user_id) for user_id in created.values()]
+            )
+            self.users.update(created)
+            self.created_users += len(missing)
+        return self.users
+
+    def group_ids(self, slugs):
+        missing = set(slugs) - set(self.groups) - {'', None}
+        if missing:
+            Group.objects.bulk_create([
+                Group(title=slug, slug=slug, description='')
+                for slug in missing
+            ])
+            self.groups.update(Group.objects.filter(
+                slug__in=missing
+            ).values_list('slug', 'pk'))
+            self.created_groups += len(missing)
+            generations.bump('groups')
+        return self.groups
+
+    def load_posts(self, batch):
+        users = self.user_ids(record['author'] for record in batch)
+        groups = self.group_ids(record.get('group') for record in batch)
+        posts = [
+            Post(
+                author_id=users[record['author']],
+                group_id=groups.get(record.get('group')),
+                text=record['text'],
+                image=record.get('image') or '',
+                created=_created(record.get('created')),
+            )
+            for record in batch
+        ]
+        _insert(Post, posts)
+        # повторный импорт того же файла перенаправляет его id на новые посты
+        source_ids = [int(record['id']) for record in batch]
+        ImportedPost.objects.filter(source_id__in=source_ids).delete()
+        ImportedPost.objects.bulk_create([
+            ImportedPost(source_id=source_id, post_id=post.pk)
+            for source_id, post in zip(source_ids, posts)
+        ])
+        index.get_index().add_many((post.pk, post.text) for post in posts)
+        self.user_counts.update(
+            ('posts_count', post.author_id) for post in posts
+        )
+        self.group_counts.update(
+            post.group_id for post in posts if post.group_id
+        )
+
+    def load_comments(self, batch):
+        users = self.user_ids(record['author'] for record in batch)
+        # пост из импорта ищется по id в его файле, остальные — по id в базе
+        imported = dict(ImportedPost.objects.filter(
+            source_id__in={int(record['post']) for record in batch}
+        ).values_list('source_id', 'post_id'))
+        comments = [
+            Comment(
+                post_id=imported.get(
+                    int(record['post']), int(record['post'])
+                ),
+                author_id=users[record['author']],
+                text=record['text'],
+                created=_created(record.get('created')),
+            )
+            for record in batch
+        ]
+        _insert(Comment, comments)
+        self.apply_comments({comment.post_id for comment in comments})
+
+    def load_follows(self, batch):
+        users = self.user_ids(itertools.chain.from_iterable(
+            (record['user'], record['author']) for record in batch
+        ))
+        follows = [
+            Follow(
+                user_id=users[record['user']],
+                author_id=users[record['author']],
+                created=_created(record.get('created')),
+            )
+            for record in batch
+        ]
+        # повторы в файле и уже существующие подписки пропускаются, чтобы
+        # не завысить счётчики
+        follows = list({
+            (follow.user_id, follow.author_id): follow for follow in follows
+        }.values())
+        existing = set(Follow.objects.filter(
+            user_id__in={follow.user_id for follow in follows},
+            author_id__in={follow.author_id for follow in follows},
+        ).values_list('user_id', 'author_id'))
+        follows = [
+            follow for follow in follows
+            if (follow.user_id, follow.author_id) not in existing
+        ]
+        created = [follow.created for follow in follows]
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        _set_created(Follow, [
+            ({'user_id': follow.user_id, 'author_id': follow.author_id}, value)
+            for follow, value in zip(follows, created)
+        ])
+        for follow in follows:
+            self.user_counts['followers_count', follow.author_id] += 1
+            self.user_counts['following_count', follow.user_id] += 1
+        self.readers.update(follow.user_id for follow in follows)
+
+    def apply_comments(self, post_ids):
+        """Счётчики, поиск и поколения постов с комментариями из пачки.
+
+        Каждый пост пачки обрабатывается один раз; между пачками ничего
+        не копится, и память не растёт с числом постов.
+        """
+        post_ids = list(post_ids)
+        counters.recount_posts(Post.objects.filter(pk__in=post_ids))
+        index.reindex(post_ids)
+        generations.bump(*(f'post:{post_id}' for post_id in post_ids))
+
+    def apply_counts(self):
+        """Счётчики и поколения кэша авторов и групп за весь импорт."""
+        scopes = set()
+        for (field, user_id), count in self.user_counts.items():
+            counters.change_user_stats(user_id, field, count)
+            if field != 'following_count':
+                scopes.add(f'author:{user_id}')
+            if field == 'posts_count':
+                scopes.add('index')
+        for group_id, count in self.group_counts.items():
+            counters.change_group_posts(group_id, count)
+            scopes.add(f'group:{group_id}')
+        generations.bump(*scopes)
+        snapshots.schedule(*scopes)
+
+    def rebuild_feeds(self):
+        """Ленты читателей новых подписок и подписчиков авторов новых постов.
+
+        Наборы id ограничены числом пользователей, а не размером файла.
+        """
+        readers = set(self.readers)
+        authors = list({
+            user_id for field, user_id in self.user_counts
+            if field == 'posts_count'
+        })
+        for start in range(0, len(authors), self.batch_size):
+            readers.update(Follow.objects.filter(
+                author_id__in=authors[start:start + self.batch_size]
+            ).values_list('user_id', flat=True))
+        for user_id in readers:
+            feed.rebuild(user_id)
@@ -1,88 +1,130 @@
-import datetime
+import re
 
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 
-from .models import Post, Group, User, Follow
+from core.concurrency import gather
+from core.conditional import feed_condition
+from core.paginator import CursorPaginator
+from core.ratelimit import ratelimit
+
+from . import conditions, counters, transfer
+from .snapshots import anonymous_snapshot
+from .models import Comment, Post, Group, User, Follow
 
 from .forms import PostForm, CommentForm
 
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def paginator(request, post_list, scope, count=None):
+    paginator = CursorPaginator(post_list, 10, scope=scope, count=count)
+    return paginator.get_cursor_page(request.GET)
 
-def paginator(request, post_list):
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+
+def comments_page(request, post_id):
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).for_list(),
+        settings.COMMENTS_PER_PAGE,
+    )
+    return paginator.get_cursor_page(request.GET)
 
 
+@anonymous_snapshot
+@feed_condition(conditions.index_state, personal=True)
 def index(request):
-    post_list = Post.objects.all()
-    # добавлено, чтобы время публикации постов
-    # отображалось в часовом поясе пользователя
-    LOCAL_TIMEZONE = datetime.datetime.now(
-        datetime.timezone.utc
-    ).astimezone().tzinfo
+    post_list = Post.objects.for_feed()
     context = {
-        'page_obj': paginator(request, post_list),
-        'local_timezone': LOCAL_TIMEZONE,
+        'page_obj': paginator(request, post_list, 'index'),
     }
     return render(request, 'posts/index.html', context)
 
 
+@anonymous_snapshot
+@feed_condition(conditions.group_state, personal=True)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    LOCAL_TIMEZONE = datetime.datetime.now(
-        datetime.timezone.utc
-    ).astimezone().tzinfo
+    post_list = group.posts.for_feed()
     context = {
         'group': group,
-        'page_obj': paginator(request, post_list),
-        'local_timezone': LOCAL_TIMEZONE,
+        'page_obj': paginator(
+            request, post_list, f'group:{group.pk}', group.posts_count
+        ),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@feed_condition(conditions.profile_state, personal=True)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    LOCAL_TIMEZONE = datetime.datetime.now(
-        datetime.timezone.utc
-    ).astimezone().tzinfo
-    following = Follow.objects.filter(
-        user=request.user if request.user.is_authenticated else None,
-        author=author
-    ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    user = request.user if request.user.is_authenticated else None
+    # у пользователя, заведённого в обход сигнала, строки статистики
+    # может не быть: её заводит user_stats, шаблону она тоже нужна
+    stats = counters.user_stats(author)
+    page_obj, following = gather(
+        lambda: paginator(
+            request, author.posts.for_feed(), f'author:{author.pk}',
+            stats.posts_count,
+        ),
+        lambda: Follow.objects.filter(user=user, author=author).exists(),
+    )
     context = {
         'author': author,
-        'page_obj': paginator(request, author.posts.all()),
-        'local_timezone': LOCAL_TIMEZONE,
+        'page_obj': page_obj,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@feed_condition(conditions.post_state, personal=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post, comments = gather(
+        lambda: get_object_or_404(
+            Post.objects.for_feed().select_related('author__stats'),
+            pk=post_id
+        ),
+        lambda: comments_page(request, post_id),
+    )
+    # шаблон показывает число постов автора
+    counters.user_stats(post.author)
     current_user = request.user
     form = CommentForm()
     date = timezone.now
-    LOCAL_TIMEZONE = datetime.datetime.now(
-        datetime.timezone.utc
-    ).astimezone().tzinfo
     context = {
         'post': post,
         'current_user': current_user,
-        'comments': post.comments.all(),
+        'comments': comments,
         'form': form,
         'date': date,
-        'local_timezone': LOCAL_TIMEZONE,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев для подгрузки на странице записи."""
+    post = get_object_or_404(Post, pk=post_id)
+    context = {
+        'post': post,
+        'comments': comments_page(request, post_id),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
+@ratelimit('post_create', methods=['POST'])
 def post_create(request):
     user = request.user
     form = PostForm(
@@ -117,6 +159,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@ratelimit('add_comment')
 def add_comment(request, post_id):
     user = request.user
     post = get_object_or_404(Post, pk=post_id)
@@ -130,21 +173,19 @@ def add_comment(request, post_id):
 
 
 @login_required
+@feed_condition(conditions.follow_state, personal=True)
 def follow(request):
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    )
-    LOCAL_TIMEZONE = datetime.datetime.now(
-        datetime.timezone.utc
-    ).astimezone().tzinfo
+    entries = request.user.feed.for_feed()
+    page_obj = paginator(request, entries, f'feed:{request.user.pk}')
+    page_obj.object_list = [entry.post for entry in page_obj]
     context = {
-        'local_timezone': LOCAL_TIMEZONE,
-        'page_obj': paginator(request, post_list),
+        'page_obj': page_obj,
     }
     return render(request, 'posts/followed.html', context)
 
 
 @login_required
+@ratelimit('follow')
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
@@ -157,6 +198,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@ratelimit('follow')
 def profile_unfollow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
@@ -165,3 +207,36 @@ def profile_unfollow(request, username):
         author=author,
     ).delete()
     return redirect('posts:profile', username)
+
+
+@login_required
+@ratelimit('export')
+def profile_export(request, username):
+    """Выгрузка своих постов потоком: ни файл, ни модели не в памяти."""
+    if request.user.username != username:
+        raise PermissionDenied
+    format = request.GET.get('format', 'csv')
+    if format not in EXPORT_CONTENT_TYPES:
+        format = 'csv'
+    rows = transfer.export_rows(
+        'posts', queryset=Post.objects.filter(author=request.user)
+    )
+    chunks = (
+        chunk.encode() for chunk in transfer.chunked(transfer.iter_records(
+            rows, transfer.FIELDS['posts'], format
+        ))
+    )
+    gzip = ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if gzip:
+        # сжатие по ходу выдачи, как у GZipMiddleware
+        chunks = compress_sequence(chunks)
+    response = StreamingHttpResponse(
+        chunks, content_type=EXPORT_CONTENT_TYPES[format]
+    )
+    if gzip:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Content-Disposition'] = (
+        f'attachment; filename="{username}-posts.{format}"'
+    )
+    return response
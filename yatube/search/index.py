@@ -0,0 +1,275 @@
+"""Полнотекстовый индекс постов с ранжированием BM25.
+
+Документ индекса — текст поста вместе с текстами комментариев к нему.
+Ранг — BM25 со знаком минус, как у FTS5: чем меньше, тем лучше.
+Выдача упорядочена по (rank, post_id), по этому ключу строятся курсоры.
+"""
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count
+
+from core.jobs import task
+from posts.models import Comment, Post
+
+from .models import Posting, SearchDocument
+from .text import fold, tokenize
+
+FTS_TABLE = 'search_fts'
+
+# параметры BM25, те же, что у bm25() в FTS5
+K1 = 1.2
+B = 0.75
+
+
+def document_text(post_id):
+    """Текст поста и его комментариев или None, если поста нет."""
+    texts = list(
+        Post.objects.filter(pk=post_id).values_list('text', flat=True)
+    )
+    if not texts:
+        return None
+    texts.extend(Comment.objects.filter(
+        post_id=post_id
+    ).order_by('created', 'pk').values_list('text', flat=True))
+    return ' '.join(texts)
+
+
+def documents(batch_size):
+    """Тексты всех постов пачками по batch_size: [(post_id, text), ...]."""
+    posts = Post.objects.order_by('pk').values_list('pk', 'text')
+    last = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            return
+        yield _with_comments(batch)
+        last = batch[-1][0]
+
+
+def _with_comments(posts):
+    """[(post_id, text), ...] с текстами комментариев, одним запросом."""
+    comments = {}
+    for post_id, text in Comment.objects.filter(
+        post_id__in=[post_id for post_id, _ in posts]
+    ).order_by('created', 'pk').values_list('post_id', 'text'):
+        comments.setdefault(post_id, []).append(text)
+    return [
+        (post_id, ' '.join([text] + comments.get(post_id, [])))
+        for post_id, text in posts
+    ]
+
+
+def _in_range(row, after, before):
+    if after is not None:
+        return row > after
+    if before is not None:
+        return row < before
+    return True
+
+
+class FtsIndex:
+    """Индекс в виртуальной таблице SQLite FTS5.
+
+    Текст хранится уже нормализованным fold(), чтобы слова совпадали
+    с обратным индексом в таблицах.
+    """
+    name = 'fts5'
+
+    def update(self, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, body) VALUES (%s, %s)',
+                [post_id, fold(text)],
+            )
+
+    def add_many(self, docs):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, body) VALUES (%s, %s)',
+                [(post_id, fold(text)) for post_id, text in docs],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, query, limit, after=None, before=None):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # каждое слово в кавычках: синтаксис запросов FTS5 не нужен
+        sql = [
+            f'SELECT rank, rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+        ]
+        params = [' '.join(f'"{term}"' for term in terms)]
+        order = 'ASC'
+        if after is not None:
+            sql.append('AND (rank, rowid) > (%s, %s)')
+            params.extend(after)
+        elif before is not None:
+            sql.append('AND (rank, rowid) < (%s, %s)')
+            params.extend(before)
+            order = 'DESC'
+        sql.append(f'ORDER BY rank {order}, rowid {order} LIMIT %s')
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(' '.join(sql), params)
+            return [tuple(row) for row in cursor.fetchall()]
+
+
+class TableIndex:
+    """Обратный индекс в обычных таблицах, BM25 считается в Python."""
+    name = 'table'
+
+    def update(self, post_id, text):
+        terms = tokenize(text)
+        with transaction.atomic():
+            Posting.objects.filter(document_id=post_id).delete()
+            SearchDocument.objects.update_or_create(
+                post_id=post_id, defaults={'length': len(terms)}
+            )
+            Posting.objects.bulk_create([
+                Posting(term=term, document_id=post_id, frequency=frequency)
+                for term, frequency in Counter(terms).items()
+            ])
+
+    def add_many(self, docs):
+        parsed = [(post_id, tokenize(text)) for post_id, text in docs]
+        SearchDocument.objects.bulk_create([
+            SearchDocument(post_id=post_id, length=len(terms))
+            for post_id, terms in parsed
+        ])
+        Posting.objects.bulk_create([
+            Posting(term=term, document_id=post_id, frequency=frequency)
+            for post_id, terms in parsed
+            for term, frequency in Counter(terms).items()
+        ])
+
+    def remove(self, post_id):
+        SearchDocument.objects.filter(post_id=post_id).delete()
+
+    def clear(self):
+        Posting.objects.all().delete()
+        SearchDocument.objects.all().delete()
+
+    def search(self, query, limit, after=None, before=None):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        postings = {}
+        for term in terms:
+            postings[term] = dict(
+                (document_id, (frequency, length))
+                for document_id, frequency, length in Posting.objects.filter(
+                    term=term
+                ).values_list('document_id', 'frequency', 'document__length')
+            )
+            if not postings[term]:
+                return []
+        # как MATCH в FTS5: документ должен содержать все слова запроса
+        found = set.intersection(*(set(p) for p in postings.values()))
+        stats = SearchDocument.objects.aggregate(
+            total=Count('pk'), average=Avg('length')
+        )
+        total, average = stats['total'], stats['average'] or 1
+        rows = []
+        for document_id in found:
+            score = 0
+            for term_postings in postings.values():
+                frequency, length = term_postings[document_id]
+                df = len(term_postings)
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                score += idf * frequency * (K1 + 1) / (
+                    frequency + K1 * (1 - B + B * length / average)
+                )
+            rows.append((-score, document_id))
+        rows = sorted(
+            (row for row in rows if _in_range(row, after, before)),
+            reverse=before is not None,
+        )
+        return rows[:limit]
+
+
+# наличие таблицы FTS5 по имени файла БД, чтобы не проверять на каждом запросе
+_fts_tables = {}
+
+
+def _fts_available():
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = (
+            FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[name]
+
+
+def get_index():
+    backend = settings.SEARCH_BACKEND
+    if backend == 'auto':
+        backend = 'fts5' if _fts_available() else 'table'
+    return FtsIndex() if backend == 'fts5' else TableIndex()
+
+
+@task
+def index_post(post_id):
+    """Обновляет документ поста; удалённый пост убирает из индекса."""
+    text = document_text(post_id)
+    if text is None:
+        get_index().remove(post_id)
+    else:
+        get_index().update(post_id, text)
+
+
+@task(unique=True)
+def index_comments(post_id):
+    """Обновляет документ после изменения комментариев.
+
+    Если пост удалён — например, комментарии удаляются каскадом вместе с
+    ним, — ничего не делает: документ уберёт remove_post.
+    """
+    text = document_text(post_id)
+    if text is not None:
+        get_index().update(post_id, text)
+
+
+@task
+def remove_post(post_id):
+    get_index().remove(post_id)
+
+
+def reindex(post_ids):
+    """Обновляет документы пачки постов, например после массового импорта."""
+    index = get_index()
+    posts = list(
+        Post.objects.filter(pk__in=post_ids).values_list('pk', 'text')
+    )
+    with transaction.atomic():
+        for post_id in post_ids:
+            index.remove(post_id)
+        index.add_many(_with_comments(posts))
+
+
+def rebuild(batch_size=1000):
+    """Строит индекс заново по всем постам; возвращает их число."""
+    index = get_index()
+    indexed = 0
+    with transaction.atomic():
+        index.clear()
+        for docs in documents(batch_size):
+            index.add_many(docs)
+            indexed += len(docs)
+    return indexed
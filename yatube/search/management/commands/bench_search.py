@@ -0,0 +1,129 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.management.utils import temporary_database
+from posts.models import Post, User
+from search import index
+
+SYLLABLES = [
+    consonant + vowel
+    for consonant in 'bcdfghklmnprstvz'
+    for vowel in 'aeiou'
+]
+
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words, key=lambda word: rng.random())
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по индексу с text__icontains на синтетических '
+        'постах во временной БД'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument(
+            '--backends', default='icontains,fts5',
+            help='Через запятую: icontains, fts5, table',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Повторов каждого запроса',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        with temporary_database(prefix='yatube-search-'):
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        vocabulary = make_vocabulary(20000, rng)
+        # частоты слов по закону Ципфа, как в естественном тексте
+        weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, len(vocabulary) + 1)
+        ))
+        started = time.perf_counter()
+        self.seed_posts(options['posts'], vocabulary, weights, rng)
+        self.stdout.write(
+            f'Создано постов: {options["posts"]} '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
+        queries = [vocabulary[rank] for rank in (5, 50, 500, 5000)]
+        queries.append(f'{vocabulary[5]} {vocabulary[50]}')
+        backends = options['backends'].split(',')
+        results = {backend: self.measure(backend, queries, options)
+                   for backend in backends}
+        self.stdout.write(
+            f'{"запрос":<24}' + ''.join(f'{b:>12}' for b in backends)
+        )
+        for query in queries:
+            self.stdout.write(f'{query:<24}' + ''.join(
+                f'{results[backend][query]:>9.2f} мс' for backend in backends
+            ))
+
+    def seed_posts(self, count, vocabulary, weights, rng):
+        author = User.objects.create_user(username='bench')
+        batch_size = 10000
+        with transaction.atomic():
+            for start in range(0, count, batch_size):
+                Post.objects.bulk_create([
+                    Post(
+                        author=author,
+                        text=' '.join(rng.choices(
+                            vocabulary,
+                            cum_weights=weights,
+                            k=rng.randint(8, 30),
+                        )),
+                    )
+                    for _ in range(min(batch_size, count - start))
+                ])
+
+    def build_index(self, backend):
+        search_index = (
+            index.FtsIndex() if backend == 'fts5' else index.TableIndex()
+        )
+        started = time.perf_counter()
+        with transaction.atomic():
+            search_index.clear()
+            for docs in index.documents(10000):
+                search_index.add_many(docs)
+        self.stdout.write(
+            f'Индекс {backend} построен '
+            f'за {time.perf_counter() - started:.1f} с'
+        )
+        return search_index
+
+    def measure(self, backend, queries, options):
+        if backend == 'icontains':
+            def search(query):
+                posts = Post.objects.all()
+                for word in query.split():
+                    posts = posts.filter(text__icontains=word)
+                return list(posts.order_by('-created', '-pk').values_list(
+                    'pk', flat=True
+                )[:11])
+        else:
+            search_index = self.build_index(backend)
+
+            def search(query):
+                return search_index.search(query, 11)
+        timings = {}
+        for query in queries:
+            samples = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                search(query)
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[query] = statistics.median(samples)
+        return timings
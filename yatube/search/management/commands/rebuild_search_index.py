@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from search import index
+
+
+class Command(BaseCommand):
+    help = 'Строит поисковый индекс заново по всем постам и комментариям'
+
+    def handle(self, *args, **options):
+        indexed = index.rebuild()
+        self.stdout.write(
+            f'Проиндексировано постов: {indexed} ({index.get_index().name})'
+        )
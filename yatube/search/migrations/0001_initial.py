@@ -0,0 +1,98 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:47
+
+from collections import Counter
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+from search.text import fold, tokenize
+
+FTS_TABLE = 'search_fts'
+
+
+def document_texts(apps):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    comments = {}
+    for post_id, text in Comment.objects.values_list('post_id', 'text'):
+        comments.setdefault(post_id, []).append(text)
+    for post_id, text in Post.objects.values_list('pk', 'text').iterator():
+        yield post_id, ' '.join([text] + comments.get(post_id, []))
+
+
+def create_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+                    f"body, tokenize='unicode61 remove_diacritics 2')"
+                )
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE}(rowid, body) VALUES (%s, %s)',
+                    [
+                        (post_id, fold(text))
+                        for post_id, text in document_texts(apps)
+                    ],
+                )
+            return
+        except OperationalError:
+            # SQLite собран без FTS5: остаётся индекс в таблицах
+            pass
+    SearchDocument = apps.get_model('search', 'SearchDocument')
+    Posting = apps.get_model('search', 'Posting')
+    for post_id, text in document_texts(apps):
+        terms = tokenize(text)
+        SearchDocument.objects.create(post_id=post_id, length=len(terms))
+        Posting.objects.bulk_create([
+            Posting(term=term, document_id=post_id, frequency=frequency)
+            for term, frequency in Counter(terms).items()
+        ])
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('posts', '0014_thumbnail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='posts.Post', verbose_name='запись')),
+                ('length', models.PositiveIntegerField(verbose_name='число слов')),
+            ],
+            options={
+                'verbose_name': 'документ поиска',
+                'verbose_name_plural': 'документы поиска',
+            },
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='слово')),
+                ('frequency', models.PositiveIntegerField(verbose_name='число вхождений')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='search.SearchDocument', verbose_name='документ')),
+            ],
+            options={
+                'verbose_name': 'вхождение слова',
+                'verbose_name_plural': 'обратный индекс',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='posting',
+            constraint=models.UniqueConstraint(fields=('term', 'document'), name='unique_posting'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,44 @@
+from django.db import models
+
+from posts.models import Post
+
+
+class SearchDocument(models.Model):
+    """Проиндексированный пост для индекса в таблицах БД.
+
+    Используется, когда SQLite собран без FTS5 или БД не SQLite.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+        verbose_name='запись',
+    )
+    length = models.PositiveIntegerField(verbose_name='число слов')
+
+    class Meta:
+        verbose_name = 'документ поиска'
+        verbose_name_plural = 'документы поиска'
+
+
+class Posting(models.Model):
+    """Вхождение слова в документ: строка обратного индекса."""
+    term = models.CharField(max_length=64, verbose_name='слово')
+    document = models.ForeignKey(
+        SearchDocument,
+        on_delete=models.CASCADE,
+        related_name='postings',
+        verbose_name='документ',
+    )
+    frequency = models.PositiveIntegerField(verbose_name='число вхождений')
+
+    class Meta:
+        verbose_name = 'вхождение слова'
+        verbose_name_plural = 'обратный индекс'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'document'],
+                name='unique_posting'
+            )
+        ]
@@ -0,0 +1,54 @@
+from core.paginator import CursorPaginator
+
+from posts.models import Post
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорный пагинатор выдачи поиска по ключу (rank, post_id)."""
+
+    key_parsers = (float, int)
+
+    def __init__(self, query, per_page, index):
+        super().__init__(query, per_page)
+        self.index = index
+
+    # число найденных записей индекс не считает
+    count_info = (None, False)
+
+    def get_page(self, number):
+        # выдача не нумеруется заранее: ?page=N ведёт на первую страницу
+        return self._fetch_after(None, 1)
+
+    def _key(self, post):
+        return post.search_rank, post.pk
+
+    def _posts(self, hits):
+        posts = Post.objects.for_feed().in_bulk([pk for _, pk in hits])
+        rows = []
+        for rank, pk in hits:
+            # пост могли удалить после индексации
+            if pk in posts:
+                posts[pk].search_rank = rank
+                rows.append(posts[pk])
+        return rows
+
+    def _fetch_after(self, key, number):
+        hits = self.index.search(
+            self.object_list, self.per_page + 1, after=key
+        )
+        rows = self._posts(hits[:self.per_page])
+        if key is None:
+            number = 1
+        return self._build_page(
+            rows, number, len(hits) > self.per_page and bool(rows)
+        )
+
+    def _fetch_before(self, key, number):
+        hits = self.index.search(
+            self.object_list, self.per_page + 1, before=key
+        )
+        if len(hits) <= self.per_page:
+            return self._fetch_after(None, 1)
+        return self._build_page(
+            self._posts(hits[self.per_page - 1::-1]), max(number, 2), True
+        )
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts.models import Comment, Post
+
+from . import index
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, **kwargs):
+    index.index_post.delay(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    index.remove_post.delay(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    # при удалении поста сигнал приходит на каждый его комментарий:
+    # одинаковые задания в очереди сливаются в одно
+    index.index_comments.delay(instance.post_id)
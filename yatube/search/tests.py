@@ -0,0 +1,128 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import jobs
+from core.models import Job
+from posts.models import Comment, Post, User
+
+from . import index
+from .text import tokenize
+
+
+class TokenizeTests(TestCase):
+    def test_tokenize_folds_case_and_diacritics(self):
+        self.assertEqual(
+            tokenize('Ёжик_в ТУМАНЕ, café!'),
+            ['ежик', 'в', 'тумане', 'cafe'],
+        )
+        self.assertEqual(tokenize('Новый'), ['новый'])
+
+
+class SearchTestsMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    def create_post(self, text):
+        return Post.objects.create(text=text, author=self.user)
+
+    def search(self, query, limit=10, **kwargs):
+        hits = index.get_index().search(query, limit, **kwargs)
+        return [pk for _, pk in hits]
+
+    def test_backend(self):
+        self.assertEqual(index.get_index().name, self.backend)
+
+    def test_finds_post_and_comment_text(self):
+        post = self.create_post('Кот сидит на окне')
+        self.create_post('Собака лает')
+        self.assertEqual(self.search('кот'), [post.pk])
+        Comment.objects.create(post=post, author=self.user, text='рыжий')
+        self.assertEqual(self.search('рыжий кот'), [post.pk])
+
+    def test_all_words_required(self):
+        self.create_post('Кот сидит на окне')
+        self.assertEqual(self.search('кот собака'), [])
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_ranked_by_bm25(self):
+        rare = self.create_post('кот и много других слов в этом тексте')
+        often = self.create_post('кот кот кот')
+        self.create_post('пёс')
+        self.assertEqual(self.search('кот'), [often.pk, rare.pk])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = self.create_post('старый текст')
+        post.text = 'новый текст'
+        post.save()
+        self.assertEqual(self.search('старый'), [])
+        self.assertEqual(self.search('новый'), [post.pk])
+        post.delete()
+        self.assertEqual(self.search('новый'), [])
+
+    @override_settings(JOBS_ALWAYS_EAGER=False)
+    def test_comment_changes_are_coalesced(self):
+        post = self.create_post('пост')
+        for number in range(3):
+            Comment.objects.create(post=post, author=self.user, text='кот')
+        self.assertEqual(Job.objects.filter(
+            task='search.index.index_comments'
+        ).count(), 1)
+        jobs.work(burst=True)
+        self.assertEqual(self.search('кот'), [post.pk])
+        post.delete()
+        jobs.work(burst=True)
+        self.assertEqual(self.search('кот'), [])
+
+    def test_cursor_pages(self):
+        posts = [self.create_post(f'кот {i}') for i in range(15)]
+        first = index.get_index().search('кот', 10)
+        second = index.get_index().search('кот', 10, after=first[-1])
+        self.assertEqual(len(second), 5)
+        self.assertEqual(
+            sorted(pk for _, pk in first + second),
+            sorted(post.pk for post in posts),
+        )
+        back = index.get_index().search('кот', 10, before=second[0])
+        self.assertEqual(back, first[::-1])
+
+    def test_search_view(self):
+        for i in range(15):
+            self.create_post(f'кот {i}')
+        response = self.client.get(reverse('search:search'), {'q': 'Кот'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, '?q=%D0%9A%D0%BE%D1%82&amp;after=')
+        response = self.client.get(reverse('search:search'), {
+            'q': 'Кот', 'after': page_obj.next_cursor,
+        })
+        self.assertEqual(len(response.context['page_obj']), 5)
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_rebuild_command(self):
+        post = self.create_post('кот')
+        index.get_index().clear()
+        self.assertEqual(self.search('кот'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Проиндексировано постов: 1', out.getvalue())
+        self.assertEqual(self.search('кот'), [post.pk])
+
+
+@override_settings(SEARCH_BACKEND='fts5')
+class FtsSearchTests(SearchTestsMixin, TestCase):
+    backend = 'fts5'
+
+
+@override_settings(SEARCH_BACKEND='table')
+class TableSearchTests(SearchTestsMixin, TestCase):
+    backend = 'table'
+
+    def test_empty_search_page(self):
+        response = self.client.get(reverse('search:search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['page_obj'])
@@ -0,0 +1,29 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# как токенизатор unicode61 в FTS5: буквы и цифры, без подчёркивания
+WORD_RE = re.compile(r'[^\W_]+')
+
+MAX_TERM_LENGTH = 64
+
+
+@lru_cache(maxsize=None)
+def _fold_char(char):
+    base = unicodedata.normalize('NFKD', char)[0]
+    # диакритику снимаем только с латиницы: «й» — отдельная буква
+    return base if base.isascii() else char
+
+
+def fold(text):
+    """Нижний регистр, «ё» как «е», латиница без диакритики."""
+    text = text.lower().replace('ё', 'е')
+    if text.isascii():
+        return text
+    return ''.join(map(_fold_char, text))
+
+
+def tokenize(text):
+    return [
+        word[:MAX_TERM_LENGTH] for word in WORD_RE.findall(fold(text))
+    ]
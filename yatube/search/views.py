@@ -0,0 +1,22 @@
+from urllib.parse import urlencode
+
+from django.shortcuts import render
+
+from .index import get_index
+from .paginator import SearchPaginator
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = SearchPaginator(
+            query, 10, get_index()
+        ).get_cursor_page(request.GET)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        # ссылки пагинатора сохраняют поисковый запрос
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'search/search.html', context)
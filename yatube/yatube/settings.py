@@ -40,6 +40,9 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'search.apps.SearchConfig',
+    'api.apps.ApiConfig',
+    'benchmarks.apps.BenchmarksConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,11 +53,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.TimezoneMiddleware',
+    'core.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,13 +70,16 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.profiling.ProfiledDjangoTemplates',
+        # имя по умолчанию бралось бы из пути бэкенда: 'profiling'
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
+                'django.template.context_processors.tz',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
@@ -81,17 +90,56 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# профиль выбирается переменной окружения DATABASE_BACKEND
+DATABASE_BACKENDS = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'yatube'),
+        'USER': os.environ.get('POSTGRES_USER', 'yatube'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        # соединение живёт между запросами, см. DATABASE_HEALTH_CHECKS
+        'CONN_MAX_AGE': int(os.environ.get('DATABASE_CONN_MAX_AGE', 600)),
+        'OPTIONS': {'connect_timeout': 5},
+    },
+}
+
+DATABASES = {
+    'default': dict(
+        DATABASE_BACKENDS[os.environ.get('DATABASE_BACKEND', 'sqlite')]
+    ),
+}
+
+if os.environ.get('DATABASE_NAME'):
+    DATABASES['default']['NAME'] = os.environ['DATABASE_NAME']
+
+# перед запросом постоянное соединение проверяется и при обрыве
+# открывается заново (core.db)
+DATABASE_HEALTH_CHECKS = True
+
+# PRAGMA для каждого соединения SQLite (core.db): с WAL читатели
+# не ждут писателей, а писатели ждут друг друга до busy_timeout мс
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
 }
 
+if os.environ.get('SQLITE_TUNING') == '0':
+    SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -137,7 +185,10 @@ LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# письма отправляет воркер очереди задач через EMAIL_DELIVERY_BACKEND
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -145,10 +196,123 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# LocMemCache у каждого процесса свой: при нескольких воркерах gunicorn
+# нужен общий бэкенд, его выбирают переменной окружения CACHE_BACKEND
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    },
+    'db': {
+        # таблица создаётся командой createcachetable
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yatube_cache',
+    },
+    'redis': {
+        # подойдёт и локальный сервер: python manage.py runcacheserver
+        'BACKEND': 'core.redis_cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/0',
+    },
 }
 
+CACHES = {
+    'default': dict(CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')]),
+}
+
+if os.environ.get('CACHE_LOCATION'):
+    CACHES['default']['LOCATION'] = os.environ['CACHE_LOCATION']
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# максимальная длина материализованной ленты подписок одного пользователя
+FEED_MAX_LENGTH = 1000
+
+# комментариев на странице записи; остальные подгружаются по курсору
+COMMENTS_PER_PAGE = 20
+
+# потоки для одновременных независимых запросов к БД внутри view
+# (core.concurrency); окупаются с сетевой БД, для SQLite — 0
+VIEW_THREADS = int(os.environ.get('VIEW_THREADS', 0))
+
+# потоки, в которых ASGI-приложение (yatube.asgi) выполняет запросы
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+
+# лимиты частоты запросов (core.ratelimit) на пользователя или, для
+# гостя, на IP: 'число/период', период — s, m, h или d, можно '5/10m';
+# 'default' — общий лимит на все изменяющие запросы
+RATE_LIMITS = {
+    'default': '120/m',
+    'post_create': '10/m',
+    'add_comment': '20/m',
+    'follow': '30/m',
+    'export': '1/m',
+}
+
+RATE_LIMIT_ENABLED = True
+
+# размеры миниатюр картинок постов: имя -> (геометрия, параметры sorl)
+POST_THUMBNAIL_SIZES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+
+# очередь фоновых задач (core.jobs); при отладке задачи выполняются сразу,
+# без отдельного процесса manage.py runworker
+JOBS_ALWAYS_EAGER = DEBUG
+
+# задачи без очереди ждут фиксации транзакции (transaction.on_commit);
+# TestCase её не фиксирует, и тестовый запуск (core.test_runner)
+# выполняет их сразу
+JOBS_EAGER_ON_COMMIT = True
+
+JOBS_MAX_ATTEMPTS = 5
+
+# пауза перед повтором удваивается с каждой попыткой, секунды
+JOBS_RETRY_DELAY = 10
+
+JOBS_RETRY_DELAY_MAX = 3600
+
+# задание, которое воркер держит дольше, возвращается в очередь, секунды
+JOBS_LOCK_TIMEOUT = 600
+
+# индекс поиска: 'auto' выбирает FTS5, если SQLite его поддерживает,
+# иначе обратный индекс в таблицах БД ('table')
+SEARCH_BACKEND = 'auto'
+
+# доля профилируемых запросов (core.profiling): 0 — выключено, 1 — все;
+# сводка по адресам на странице /admin/profiling/
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+
+# сколько последних замеров хранится в кэше
+PROFILING_BUFFER_SIZE = 1000
+
+# заголовок Server-Timing с замерами для инструментов разработчика браузера
+PROFILING_SERVER_TIMING = DEBUG
+
+# сколько первых страниц главной и групп заранее рендерится для гостей
+# (posts.snapshots); при отладке и с кэшем одного процесса 0 — страницы
+# всегда из шаблонов
+SNAPSHOT_PAGES = int(os.environ.get(
+    'SNAPSHOT_PAGES',
+    0 if DEBUG or CACHES['default']['BACKEND'].endswith('LocMemCache') else 3,
+))
+
+# часовые пояса, для которых строятся снимки: по одному на смещение от
+# UTC, гости из других поясов получают снимок пояса с тем же смещением
+SNAPSHOT_TIME_ZONES = os.environ.get('SNAPSHOT_TIME_ZONES', ','.join([
+    TIME_ZONE, 'Europe/Kaliningrad', 'Europe/Moscow', 'Europe/Samara',
+    'Asia/Yekaterinburg', 'Asia/Omsk', 'Asia/Krasnoyarsk', 'Asia/Irkutsk',
+    'Asia/Yakutsk', 'Asia/Vladivostok', 'Asia/Magadan', 'Asia/Kamchatka',
+])).split(',')
+
+# каталог для копий снимков, которые отдаёт фронтовой прокси; None — нет
+SNAPSHOT_ROOT = os.environ.get('SNAPSHOT_ROOT')
+
+# до скольких записей пагинатор считает их точно; больше — приблизительно
+# по статистике БД или кэшированному COUNT(*) (core.counting)
+COUNT_EXACT_LIMIT = 1000
+
+# сколько живёт в кэше приблизительное число записей, секунды
+COUNT_CACHE_TIMEOUT = 600